@@ -1,7 +1,7 @@
 """
 __________________________________________________________
 
-  LGA_AutoStamps v0.91 | Lega
+  LGA_AutoStamps v0.92 | Lega
   Encuentra conexiones "sucias" entre nodos y las reemplaza
   automaticamente por Stamps (Anchor + Wired) de Adrian Pueyo.
 
@@ -51,6 +51,13 @@ __________________________________________________________
     - El look sale del modulo de estilo del pack: los dos dialogos tenian su propio bloque de QSS con seis hex sueltos y un unico estilo de boton para todos.
     - El boton que ejecuta Enter va marcado en violeta. Antes los tres se veian igual, asi que el cartel no decia cual dispara Enter.
     - "Apply & Stop" salia como "Apply  Stop": Qt se come un & suelto como marca de mnemonico.
+
+  v0.92:
+    - Indice de dependencias (hijos/padres + hidden inputs) armado UNA vez por corrida y parcheado con los mismos eventos de GroupTx (created / change_input / borrado de Dots). El hold-to-peek y la re-deteccion ya no recorren todo el script en cada tecla.
+    - Conexiones largas: la geometria de cada nodo se lee una sola vez y los largos se calculan de una pasada sobre la lista de conexiones (con NumPy si esta disponible). Los candidatos salen ordenados de la conexion mas larga a la mas corta.
+    - Un solo relevamiento del script (scan_candidates) clasifica cada nodo una vez para los tres pases, en el preview y en el apply. Si se acepta el grupo de hidden inputs de un pickup, su conexion oculta ya no se ofrece ademas como conexion larga.
+    - Reuse de Anchors: el mapa origen -> Anchors existentes se arma una vez por corrida (en vez de recorrer stamps.allAnchors() por cada origen) y suma los Anchors que se van creando.
+    - Preview sin tocar el grafo: cada grupo se dibuja en una capa transparente sobre el DAG (Anchor y Wireds fantasma, conexiones nuevas y las que se cortan, Dots que se borran), calculada a partir del plan de cambios. El hold-to-peek solo oculta la capa. Ya no se crean ni se borran nodos por cada grupo que se mira. Con OVERLAY_PREVIEW = False, o si no se encuentra el DAG, se usa el preview anterior (crear + revertir).
 __________________________________________________________
 
 """
@@ -59,6 +66,11 @@ import os
 import sys
 import nuke
 
+try:
+    import numpy as np
+except ImportError:  # Opcional: sin NumPy los largos se calculan en Python puro.
+    np = None
+
 from LGA_QtAdapter_ToolPack_Layout import QtWidgets, QtGui, QtCore
 from LGA_UI_Style_ToolPack_Layout import Color, Style
 
@@ -88,9 +100,24 @@ ZOOM_MARGIN = 0.9
 #   >1.0 = mas alejado / mas contexto alrededor (ej. 1.5 = 50% mas lejos).
 ZOOM_OUT_FACTOR = 1.1
 
+# Preview: True = capa dibujada sobre el DAG, sin crear nodos (si no se
+# encuentra el widget del DAG se usa igual el modo anterior: crear + revertir).
+OVERLAY_PREVIEW = True
+
+# Tamano aproximado de un Anchor / Wired fantasma en el preview (el real
+# recien se conoce al crearlo).
+GHOST_WIDTH = 80
+GHOST_HEIGHT = 18
+
+# Cada cuantos ms la capa del preview revisa si el DAG se movio o hizo zoom.
+OVERLAY_REFRESH_MS = 30
+
 # Clases de nodos que NO participan (ni como origen ni como destino).
 SKIP_CLASSES = ["Viewer", "BackdropNode", "Root"]
 
+# A partir de cuantas conexiones conviene calcular los largos con NumPy.
+NUMPY_MIN_EDGES = 256
+
 # Variable global para activar o desactivar los prints
 DEBUG = True
 
@@ -133,6 +160,15 @@ def _import_stamps():
 # HELPERS GENERALES
 # ----------------------------------------------------------------------
 
+def node_rect(n):
+    """(x, y, w, h) del nodo en coordenadas del Node Graph."""
+    return n.xpos(), n.ypos(), n.screenWidth(), n.screenHeight()
+
+
+def rect_center(r):
+    return r[0] + r[2] / 2.0, r[1] + r[3] / 2.0
+
+
 def node_center(n):
     """Centro (x, y) del nodo en coordenadas del Node Graph."""
     cx = n.xpos() + n.screenWidth() / 2.0
@@ -140,13 +176,6 @@ def node_center(n):
     return cx, cy
 
 
-def node_distance(a, b):
-    """Distancia euclidea entre los centros de dos nodos."""
-    ax, ay = node_center(a)
-    bx, by = node_center(b)
-    return ((ax - bx) ** 2 + (ay - by) ** 2) ** 0.5
-
-
 def deselect_all():
     for n in nuke.selectedNodes():
         n.setSelected(False)
@@ -188,19 +217,138 @@ def derive_title(stamps, src):
     return title
 
 
-def build_children_map():
-    """
-    Devuelve un dict { nodo : [(downstream, input_index), ...] } a partir de
-    todas las conexiones actuales del script.
-    """
-    children = {}
-    for n in nuke.allNodes():
+class DepIndex:
+    """Indice de dependencias de la corrida: { nodo : [(downstream, input_index), ...] }
+    y los nodos con hide_input activo. Se arma UNA vez con nuke.allNodes() y
+    despues se parchea con cada cambio que hace AutoStamps (set_input,
+    add_node, remove_node), asi el peek no vuelve a recorrer todo el script."""
+
+    def __init__(self, stamps):
+        self.stamps = stamps
+        self.rescan()
+
+    def rescan(self):
+        """Vuelve a relevar el script con un solo nuke.allNodes(). El cartel no
+        es bloqueante: mientras esta abierto el usuario puede conectar nodos o
+        tocar hide_input a mano, y eso no pasa por set_input/refresh."""
+        self.children = {}
+        self.pickups = set()
+        # Orden de creacion (el de nuke.allNodes()): los hijos y pickups se
+        # devuelven en ese orden, igual que si se releyera el script entero.
+        self.seq = {}
+        self._next_seq = 0
+        # nombre del origen -> [Anchors]; se arma recien al primer anchor_for().
+        # Se descarta en cada relevamiento: Anchors creados o reconectados a
+        # mano con el cartel abierto solo aparecen releyendo allAnchors().
+        self.anchors = None
+        for n in nuke.allNodes():
+            self.add_node(n)
+
+    def add_node(self, n):
+        """Registra un nodo nuevo (ya conectado) y sus inputs."""
+        self.seq[n] = self._next_seq
+        self._next_seq += 1
         for i in range(n.inputs()):
             inp = n.input(i)
-            if inp is None:
-                continue
-            children.setdefault(inp, []).append((n, i))
-    return children
+            if inp is not None:
+                self.children.setdefault(inp, []).append((n, i))
+        self.refresh(n)
+        if self.anchors is not None:
+            try:
+                if self.stamps.isAnchor(n):
+                    self._register_anchor(n)
+            except Exception:
+                pass
+
+    def remove_node(self, n):
+        """Llamar ANTES de nuke.delete(n)."""
+        for i in range(n.inputs()):
+            inp = n.input(i)
+            if inp is not None:
+                self._unlink(inp, n, i)
+        self.children.pop(n, None)
+        self.pickups.discard(n)
+        self.seq.pop(n, None)
+
+    def set_input(self, node, idx, new_input):
+        old = node.input(idx)
+        if old is not None:
+            self._unlink(old, node, idx)
+        node.setInput(idx, new_input)
+        if new_input is not None:
+            self.children.setdefault(new_input, []).append((node, idx))
+
+    def refresh(self, n):
+        """Re-evalua si el nodo es candidato a hidden input (tras tocar hide_input)."""
+        if n.Class() in SKIP_CLASSES:
+            return
+        k = n.knob("hide_input")
+        if k and k.value() and not is_stamp(self.stamps, n):
+            self.pickups.add(n)
+        else:
+            self.pickups.discard(n)
+
+    def _register_anchor(self, anchor):
+        ai = anchor.input(0)
+        if ai is not None:
+            self.anchors.setdefault(ai.name(), []).append(anchor)
+
+    def anchor_for(self, source):
+        """Primer Anchor (en orden de creacion) cuyo input(0) es 'source', o None.
+        Los Anchors borrados o reconectados se descartan al consultarlos."""
+        if self.anchors is None:
+            self.anchors = {}
+            try:
+                for a in self.stamps.allAnchors():
+                    self._register_anchor(a)
+            except Exception:
+                pass
+        name = source.name()
+        entries = self.anchors.get(name)
+        while entries:
+            a = entries[0]
+            try:
+                ai = a.input(0)
+                if ai is not None and ai.name() == name:
+                    return a
+            except Exception:
+                pass
+            entries.pop(0)
+        return None
+
+    def _unlink(self, parent, node, idx):
+        entries = self.children.get(parent)
+        if entries and (node, idx) in entries:
+            entries.remove((node, idx))
+
+    def children_of(self, n):
+        """Hijos actuales de 'n'. Descarta entradas que ya no valen (el cartel
+        no es bloqueante: el usuario pudo reconectar o borrar algo a mano)."""
+        entries = self.children.get(n)
+        if not entries:
+            return []
+        live = []
+        for (dep, idx) in entries:
+            try:
+                if dep.input(idx) == n:
+                    live.append((dep, idx))
+            except Exception:
+                pass
+        if len(live) != len(entries):
+            self.children[n] = live
+        return sorted(live, key=lambda e: (self.seq.get(e[0], -1), e[1]))
+
+    def hidden_pickups(self):
+        """Nodos con hidden input (excluyendo Stamps, que tambien usan
+        hide_input por diseno), sobre los candidatos ya indexados."""
+        pickups = []
+        for n in sorted(self.pickups, key=lambda n: self.seq.get(n, -1)):
+            try:
+                if has_hidden_input(n):
+                    pickups.append(n)
+            except Exception:
+                self.pickups.discard(n)  # borrado a mano durante el preview
+        return pickups
 
 
 def create_anchor_below(stamps, source, title=None):
@@ -246,18 +394,6 @@ def create_wired_above(stamps, anchor, dst):
     return wired
 
 
-def existing_anchor_for_source(stamps, source):
-    """Busca un Anchor ya existente cuyo input(0) sea 'source'. None si no hay."""
-    try:
-        for a in stamps.allAnchors():
-            ai = a.input(0)
-            if ai is not None and ai.name() == source.name():
-                return a
-    except Exception:
-        pass
-    return None
-
-
 # ----------------------------------------------------------------------
 # ZOOM + DIALOGO + TRANSACCION CANCELABLE (v0.04)
 # ----------------------------------------------------------------------
@@ -282,10 +418,17 @@ def zoom_to_nodes(nodes, margin=ZOOM_MARGIN):
     nodes = [n for n in nodes if n is not None]
     if not nodes:
         return
-    minx = min(n.xpos() for n in nodes)
-    miny = min(n.ypos() for n in nodes)
-    maxx = max(n.xpos() + n.screenWidth() for n in nodes)
-    maxy = max(n.ypos() + n.screenHeight() for n in nodes)
+    zoom_to_rects([node_rect(n) for n in nodes], margin)
+
+
+def zoom_to_rects(rects, margin=ZOOM_MARGIN):
+    """Como zoom_to_nodes, pero sobre rectangulos (x, y, w, h) del DAG."""
+    if not rects:
+        return
+    minx = min(r[0] for r in rects)
+    miny = min(r[1] for r in rects)
+    maxx = max(r[0] + r[2] for r in rects)
+    maxy = max(r[1] + r[3] for r in rects)
     bw = max(maxx - minx, 1)
     bh = max(maxy - miny, 1)
     cx = (minx + maxx) / 2.0
@@ -828,7 +971,7 @@ def show_replace_dialog(suggested_name, n_children, on_peek_start=None,
     return action, name
 
 
-def snapshot_dots(dots, children):
+def snapshot_dots(dots, index):
     """Captura lo necesario para recrear un conjunto de Dots y sus conexiones
     (internas entre ellos y de borde hacia source/destinos)."""
     dot_names = set(d.name() for d in dots)
@@ -838,7 +981,7 @@ def snapshot_dots(dots, children):
         up_name = up.name() if (up is not None and up.name() in dot_names) else None
         up_ext = up if (up is not None and up.name() not in dot_names) else None
         downstream_ext = [
-            (dep, idx) for (dep, idx) in children.get(d, [])
+            (dep, idx) for (dep, idx) in index.children_of(d)
             if dep.name() not in dot_names
         ]
         snaps.append({
@@ -855,7 +998,7 @@ def snapshot_dots(dots, children):
     return snaps
 
 
-def restore_dots(snaps):
+def restore_dots(snaps, index):
     """Recrea los Dots de un snapshot y restaura todas sus conexiones."""
     name_map = {}
     # 1) Recrear todos los Dots (con knobs)
@@ -868,6 +1011,7 @@ def restore_dots(snaps):
             d["hide_input"].setValue(s["hide_input"])
         if s["tile_color"] is not None and d.knob("tile_color"):
             d["tile_color"].setValue(s["tile_color"])
+        index.add_node(d)
         name_map[s["name"]] = d
     # 2) Restaurar nombres originales (ya estan libres por el delete)
     for s in snaps:
@@ -879,10 +1023,10 @@ def restore_dots(snaps):
     for s in snaps:
         d = name_map[s["name"]]
         if s["up_name"] is not None:
-            d.setInput(0, name_map.get(s["up_name"]))
+            index.set_input(d, 0, name_map.get(s["up_name"]))
         elif s["up_ext"] is not None:
             try:
-                d.setInput(0, s["up_ext"])
+                index.set_input(d, 0, s["up_ext"])
             except Exception:
                 pass
     # 4) Restaurar destinos externos hacia los Dots
@@ -890,16 +1034,18 @@ def restore_dots(snaps):
         d = name_map[s["name"]]
         for (dep, idx) in s["downstream_ext"]:
             try:
-                dep.setInput(idx, d)
+                index.set_input(dep, idx, d)
             except Exception:
                 pass
 
 
 class GroupTx:
     """Transaccion de un grupo (Anchor + sus Wireds). Permite revertir SOLO
-    ese grupo manualmente, sin crear un Undo aparte."""
+    ese grupo manualmente, sin crear un Undo aparte. Cada cambio pasa tambien
+    por el DepIndex de la corrida para mantenerlo al dia."""
 
-    def __init__(self):
+    def __init__(self, index):
+        self.index = index
         self.created_nodes = []   # nodos a borrar en revert
         self.input_changes = []   # (node, idx, old_input) -> old debe sobrevivir
         self.knob_changes = []    # (node, knob_name, old_value)
@@ -907,20 +1053,27 @@ class GroupTx:
 
     def created(self, node):
         self.created_nodes.append(node)
+        self.index.add_node(node)
 
     def change_input(self, node, idx, new_input):
         """Cambia un input cuyo valor previo SOBREVIVE (no es un Dot a borrar)."""
         self.input_changes.append((node, idx, node.input(idx)))
-        node.setInput(idx, new_input)
+        self.index.set_input(node, idx, new_input)
 
     def change_knob(self, node, knob_name, value):
         self.knob_changes.append((node, knob_name, node[knob_name].value()))
         node[knob_name].setValue(value)
+        self.index.refresh(node)
+
+    def snapshot_dots(self, dots):
+        """Guarda los Dots a borrar. Va ANTES de reconectar sus destinos: el
+        indice esta vivo y despues ya no los lista como hijos de los Dots."""
+        self.dot_snaps.extend(snapshot_dots(dots, self.index))
 
-    def snapshot_and_delete_dots(self, dots, children):
-        self.dot_snaps.extend(snapshot_dots(dots, children))
+    def delete_dots(self, dots):
         for d in dots:
             try:
+                self.index.remove_node(d)
                 nuke.delete(d)
             except Exception:
                 pass
@@ -929,23 +1082,25 @@ class GroupTx:
         # 1) Borrar nodos creados (desconecta automaticamente sus outputs)
         for n in self.created_nodes:
             try:
+                self.index.remove_node(n)
                 nuke.delete(n)
             except Exception:
                 pass
         # 2) Restaurar inputs cuyo valor previo sobrevive
         for (node, idx, old) in reversed(self.input_changes):
             try:
-                node.setInput(idx, old)
+                self.index.set_input(node, idx, old)
             except Exception:
                 pass
         # 3) Restaurar knobs
         for (node, kn, old) in reversed(self.knob_changes):
             try:
                 node[kn].setValue(old)
+                self.index.refresh(node)
             except Exception:
                 pass
         # 4) Recrear los Dots borrados (esto reconecta los destinos)
-        restore_dots(self.dot_snaps)
+        restore_dots(self.dot_snaps, self.index)
         debug_print("Grupo cancelado: revertido al estado original.")
 
 
@@ -1022,6 +1177,189 @@ def preview_group(build_fn):
     return action, name, title
 
 
+# ----------------------------------------------------------------------
+# PREVIEW SIN TOCAR EL GRAFO (capa dibujada sobre el DAG)
+# ----------------------------------------------------------------------
+# Un "plan" describe lo que haria build_* con coordenadas del DAG ya leidas:
+#   anchor / wireds: rectangulos (x, y, w, h) fantasma (anchor_exists si se
+#   reusa un Anchor real), links: conexiones nuevas, hidden_links: Anchor ->
+#   Wired (ocultas), cut: conexiones que desaparecen, removed: Dots a borrar,
+#   context: lo que se encuadra con el zoom.
+
+def ghost_anchor_rect(src_rect):
+    """Donde quedaria el Anchor (mismo calculo que create_anchor_below)."""
+    x = src_rect[0] + src_rect[2] / 2.0 - GHOST_WIDTH / 2.0
+    y = src_rect[1] + src_rect[3] + ANCHOR_GAP_Y
+    return x, y, GHOST_WIDTH, GHOST_HEIGHT
+
+
+def ghost_wired_rect(dst_rect):
+    """Donde quedaria el Wired (mismo calculo que create_wired_above)."""
+    x = dst_rect[0] + dst_rect[2] / 2.0 - GHOST_WIDTH / 2.0
+    y = dst_rect[1] - GHOST_HEIGHT - WIRED_GAP_Y
+    return x, y, GHOST_WIDTH, GHOST_HEIGHT
+
+
+def new_plan(title, source, anchor=None):
+    src_rect = node_rect(source)
+    if anchor is not None:
+        anchor_rect = node_rect(anchor)
+        links = []
+    else:
+        anchor_rect = ghost_anchor_rect(src_rect)
+        links = [(rect_center(src_rect), rect_center(anchor_rect))]
+    return {
+        "title": title,
+        "anchor": anchor_rect,
+        "anchor_exists": anchor is not None,
+        "wireds": [],
+        "links": links,
+        "hidden_links": [],
+        "cut": [],
+        "removed": [],
+        "context": [src_rect, anchor_rect],
+    }
+
+
+def plan_wired(plan, wired_rect, dst_rects):
+    """Suma al plan un Wired y las conexiones a sus destinos."""
+    plan["wireds"].append(wired_rect)
+    plan["hidden_links"].append((rect_center(plan["anchor"]), rect_center(wired_rect)))
+    for r in dst_rects:
+        plan["links"].append((rect_center(wired_rect), rect_center(r)))
+    plan["context"].append(wired_rect)
+    plan["context"].extend(dst_rects)
+
+
+def plan_cut(plan, up, down):
+    """Conexion existente up -> down que desaparece."""
+    if up is not None and down is not None:
+        plan["cut"].append((node_center(up), node_center(down)))
+
+
+class StampsOverlay(QtWidgets.QWidget):
+    """Capa transparente sobre el DAG que dibuja el plan de un grupo. No toma
+    foco ni mouse (se puede seguir navegando el DAG) y sigue el zoom/paneo."""
+
+    def __init__(self, dag, plan):
+        super(StampsOverlay, self).__init__(parent=dag)
+        self.dag = dag
+        self.plan = plan
+        self._view = None
+
+        # Misma tecnica que scale_widget: ventana frameless translucida encima
+        # del DAG, pero transparente al input.
+        self.setWindowFlags(
+            QtCore.Qt.Window
+            | QtCore.Qt.FramelessWindowHint
+            | QtCore.Qt.WindowTransparentForInput
+            | QtCore.Qt.WindowDoesNotAcceptFocus
+        )
+        self.setAttribute(QtCore.Qt.WA_TranslucentBackground)
+        self.setAttribute(QtCore.Qt.WA_TransparentForMouseEvents)
+        self.setAttribute(QtCore.Qt.WA_ShowWithoutActivating)
+        self.setFocusPolicy(QtCore.Qt.NoFocus)
+
+        self._timer = QtCore.QTimer(self)
+        self._timer.setInterval(OVERLAY_REFRESH_MS)
+        self._timer.timeout.connect(self._sync)
+        self._sync()
+
+    def _sync(self):
+        """Reubica la capa sobre el DAG y repinta si cambio la vista."""
+        rect = self.dag.rect()
+        rect.moveTopLeft(self.dag.mapToGlobal(QtCore.QPoint(0, 0)))
+        cx, cy = nuke.center()
+        view = (nuke.zoom(), cx, cy, rect.x(), rect.y(), rect.width(), rect.height())
+        if view != self._view:
+            self._view = view
+            self.setGeometry(rect)
+            self.update()
+
+    def showEvent(self, event):
+        self._sync()
+        self._timer.start()
+        super(StampsOverlay, self).showEvent(event)
+
+    def hideEvent(self, event):
+        self._timer.stop()
+        super(StampsOverlay, self).hideEvent(event)
+
+    def _pen(self, color, style=QtCore.Qt.SolidLine, width=2):
+        pen = QtGui.QPen(QtGui.QColor(color))
+        pen.setCosmetic(True)
+        pen.setWidth(width)
+        pen.setStyle(style)
+        return pen
+
+    def _lines(self, painter, pen, lines):
+        painter.setPen(pen)
+        for (a, b) in lines:
+            painter.drawLine(QtCore.QPointF(*a), QtCore.QPointF(*b))
+
+    def _box(self, painter, r, title, solid):
+        rect = QtCore.QRectF(*r)
+        fill = QtGui.QColor(Color.ACCENT)
+        fill.setAlpha(110 if solid else 70)
+        painter.setBrush(fill)
+        painter.setPen(self._pen(
+            Color.ACCENT_HOVER, QtCore.Qt.SolidLine if solid else QtCore.Qt.DashLine
+        ))
+        painter.drawRoundedRect(rect, 3, 3)
+        painter.setPen(QtGui.QColor(Color.TEXT_STRONG))
+        painter.drawText(rect, QtCore.Qt.AlignCenter, title)
+
+    def paintEvent(self, event):
+        plan = self.plan
+        painter = QtGui.QPainter(self)
+        painter.setRenderHint(QtGui.QPainter.Antialiasing)
+        # Coordenadas del DAG -> widget (igual que scale_widget).
+        scale = nuke.zoom()
+        cx, cy = nuke.center()
+        local = QtCore.QRectF(self.rect())
+        painter.scale(scale, scale)
+        painter.translate(local.center() / scale - QtCore.QPointF(cx, cy))
+
+        self._lines(painter, self._pen(Color.ERROR_TEXT, QtCore.Qt.DashLine), plan["cut"])
+        painter.setPen(self._pen(Color.ERROR_TEXT))
+        for r in plan["removed"]:
+            painter.drawLine(QtCore.QPointF(r[0], r[1]), QtCore.QPointF(r[0] + r[2], r[1] + r[3]))
+            painter.drawLine(QtCore.QPointF(r[0] + r[2], r[1]), QtCore.QPointF(r[0], r[1] + r[3]))
+        self._lines(painter, self._pen(Color.TEXT_DIM, QtCore.Qt.DotLine, 1), plan["hidden_links"])
+        self._lines(painter, self._pen(Color.ACCENT_HOVER), plan["links"])
+
+        self._box(painter, plan["anchor"], plan["title"], plan["anchor_exists"])
+        for r in plan["wireds"]:
+            self._box(painter, r, plan["title"], False)
+        painter.end()
+
+
+def preview_overlay(dag, plan_fn):
+    """Como preview_group, pero sin tocar el grafo: dibuja el plan del grupo
+    sobre el DAG y el hold-to-peek solo oculta la capa.
+    Devuelve (action, name, title)."""
+    try:
+        plan = plan_fn()
+    except Exception:
+        plan = None  # algun nodo del grupo se borro a mano durante el preview
+    if plan is None:
+        return ACTION_SKIP, "", ""
+
+    title = plan["title"]
+    zoom_to_rects(plan["context"])
+    overlay = StampsOverlay(dag, plan)
+    overlay.show()
+    try:
+        action, name = show_replace_dialog(
+            title, len(plan["wireds"]),
+            on_peek_start=overlay.hide, on_peek_end=overlay.show,
+        )
+    finally:
+        overlay.close()
+        overlay.deleteLater()
+    return action, name, title
+
+
 # ----------------------------------------------------------------------
 # PASE 0: HIDDEN INPUTS (v0.03)
 # ----------------------------------------------------------------------
@@ -1032,38 +1370,24 @@ def has_hidden_input(n):
     return bool(k and k.value() and n.input(0) is not None)
 
 
-def find_hidden_inputs(stamps):
-    """Devuelve la lista de nodos con hidden input (excluyendo Stamps, que
-    tambien usan hide_input por diseno)."""
-    pickups = []
-    for n in nuke.allNodes():
-        if n.Class() in SKIP_CLASSES:
-            continue
-        if is_stamp(stamps, n):
-            continue
-        if has_hidden_input(n):
-            pickups.append(n)
-    return pickups
+def hidden_group_title(stamps, source, pickups):
+    """Primer label disponible entre los pickups, si no derivado del source."""
+    for p in pickups:
+        lbl = node_label(p)
+        if lbl:
+            return lbl
+    return derive_title(stamps, source)
 
 
-def build_hidden_group(stamps, source, pickups, children):
+def build_hidden_group(stamps, source, pickups, index):
     """Construye los Stamps para todos los hidden inputs que apuntan al mismo
     'source' (1 Anchor, N Wireds). NO muestra cartel ni revierte.
     Devuelve (tx, anchor, wireds, dests, title)."""
-    tx = GroupTx()
-
-    # Titulo: primer label disponible entre los pickups, si no derivado del source.
-    title = None
-    for p in pickups:
-        lbl = node_label(p)
-        if lbl:
-            title = lbl
-            break
-    if not title:
-        title = derive_title(stamps, source)
+    tx = GroupTx(index)
+    title = hidden_group_title(stamps, source, pickups)
 
     # Reuse: 1 Anchor por origen (reutiliza uno existente si ya lo hay).
-    anchor = existing_anchor_for_source(stamps, source)
+    anchor = index.anchor_for(source)
     if anchor is None:
         anchor = create_anchor_below(stamps, source, title=title)
         tx.created(anchor)
@@ -1084,10 +1408,12 @@ def build_hidden_group(stamps, source, pickups, children):
                 pass
             tx.created(wired)
             # Reconectar lo que colgaba del Dot al Wired (old = Dot -> snapshot).
-            for (dep, idx) in children.get(node, []):
-                dep.setInput(idx, wired)
+            deps = index.children_of(node)
+            tx.snapshot_dots([node])
+            for (dep, idx) in deps:
+                index.set_input(dep, idx, wired)
                 dests.append(dep)
-            tx.snapshot_and_delete_dots([node], children)
+            tx.delete_dots([node])
             wireds.append(wired)
         else:
             # No-Dot: no se borra; se le alimenta un Wired y se muestra el input.
@@ -1102,12 +1428,31 @@ def build_hidden_group(stamps, source, pickups, children):
     return tx, anchor, wireds, dests, title
 
 
-def hidden_groups(stamps):
-    """Releva los hidden inputs agrupados por nodo origen.
-    Devuelve (children_map, [(source, pickups), ...]) en orden de aparicion."""
-    children = build_children_map()
-    pickups = find_hidden_inputs(stamps)
+def plan_hidden_group(stamps, source, pickups, index):
+    """Plan de build_hidden_group, sin crear nada (ver new_plan)."""
+    plan = new_plan(
+        hidden_group_title(stamps, source, pickups), source,
+        index.anchor_for(source),
+    )
+    for node in pickups:
+        r = node_rect(node)
+        if node.Class() == "Dot":
+            # El Dot se reemplaza por un Wired en su lugar.
+            cx, cy = rect_center(r)
+            wired = (cx - GHOST_WIDTH / 2.0, cy - GHOST_HEIGHT / 2.0, GHOST_WIDTH, GHOST_HEIGHT)
+            deps = index.children_of(node)
+            for (dep, _idx) in deps:
+                plan_cut(plan, node, dep)
+            plan["removed"].append(r)
+            plan_wired(plan, wired, [node_rect(dep) for (dep, _idx) in deps])
+        else:
+            plan_wired(plan, ghost_wired_rect(r), [r])
+    return plan
 
+
+def group_hidden_pickups(stamps, pickups):
+    """Agrupa los hidden inputs por nodo origen.
+    Devuelve [(source, pickups), ...] en orden de aparicion."""
     groups = {}
     order = []
     for node in pickups:
@@ -1127,14 +1472,22 @@ def hidden_groups(stamps):
             len(pickups), len(order)
         )
     )
-    return children, [(groups[k]["source"], groups[k]["pickups"]) for k in order]
+    return [(groups[k]["source"], groups[k]["pickups"]) for k in order]
 
 
 # ----------------------------------------------------------------------
 # PASE 1: DISTRIBUCIONES POR DOTS (v0.02)
 # ----------------------------------------------------------------------
 
-def collect_dot_tree(source, children):
+def is_routing_dot(n):
+    """Dot sin hidden input (los ocultos los maneja el pase de hidden inputs)."""
+    if n.Class() != "Dot":
+        return False
+    k = n.knob("hide_input")
+    return not (k and k.value())
+
+
+def collect_dot_tree(source, index):
     """
     Desde 'source', recorre SOLO a traves de Dots de ruteo y devuelve:
       - dots: lista de Dots que forman el arbol de distribucion.
@@ -1148,15 +1501,9 @@ def collect_dot_tree(source, children):
     seen_dots = set()       # por nombre
     seen_leaves = set()     # por (nombre, idx)
 
-    def is_routing_dot(n):
-        if n.Class() != "Dot":
-            return False
-        k = n.knob("hide_input")
-        return not (k and k.value())
-
     stack = []
     # Arranque: solo seguimos los Dots (de ruteo) colgados del source.
-    for (dep, idx) in children.get(source, []):
+    for (dep, idx) in index.children_of(source):
         if is_routing_dot(dep) and dep.name() not in seen_dots:
             seen_dots.add(dep.name())
             dots.append(dep)
@@ -1164,7 +1511,7 @@ def collect_dot_tree(source, children):
 
     while stack:
         cur = stack.pop()
-        for (dep, idx) in children.get(cur, []):
+        for (dep, idx) in index.children_of(cur):
             if dep.Class() == "Dot":
                 if not is_routing_dot(dep):
                     continue  # pickup oculto: lo ignora este pase
@@ -1181,22 +1528,17 @@ def collect_dot_tree(source, children):
     return dots, leaves
 
 
-def find_dot_distributions(stamps, children, min_destinations):
+def find_dot_distributions(sources, index, min_destinations):
     """
-    Busca todos los nodos origen que reparten su salida via Dots hacia
-    >= min_destinations destinos. Devuelve lista de (source, dots, leaves).
+    De los nodos origen candidatos (los que tienen algun Dot de ruteo colgado,
+    ver scan_candidates), devuelve los que reparten su salida via Dots hacia
+    >= min_destinations destinos, como lista de (source, dots, leaves).
     Los arboles son disjuntos (un Dot tiene un solo input), asi que se
     pueden procesar todos despues de relevarlos.
     """
     results = []
-    for node in nuke.allNodes():
-        if node.Class() == "Dot":
-            continue
-        if node.Class() in SKIP_CLASSES:
-            continue
-        if is_stamp(stamps, node):
-            continue
-        dots, leaves = collect_dot_tree(node, children)
+    for node in sources:
+        dots, leaves = collect_dot_tree(node, index)
         if len(leaves) >= min_destinations:
             results.append((node, dots, leaves))
             debug_print(
@@ -1207,10 +1549,10 @@ def find_dot_distributions(stamps, children, min_destinations):
     return results
 
 
-def build_dot_distribution(stamps, source, dots, leaves, children):
+def build_dot_distribution(stamps, source, dots, leaves, index):
     """Colapsa un arbol de Dots: 1 Anchor + N Wireds, y borra los Dots.
     NO muestra cartel ni revierte. Devuelve (tx, anchor, wireds, dests, title)."""
-    tx = GroupTx()
+    tx = GroupTx(index)
     anchor = create_anchor_below(stamps, source)
     tx.created(anchor)
     try:
@@ -1218,57 +1560,88 @@ def build_dot_distribution(stamps, source, dots, leaves, children):
     except Exception:
         title = source.name()
 
+    tx.snapshot_dots(dots)
     wireds = []
     dests = []
     for (dst, idx) in leaves:
         wired = create_wired_above(stamps, anchor, dst)
         tx.created(wired)
-        dst.setInput(idx, wired)  # old = un Dot (se borrara) -> snapshot
+        index.set_input(dst, idx, wired)  # old = un Dot (se borrara) -> snapshot
         wireds.append(wired)
         dests.append(dst)
 
-    tx.snapshot_and_delete_dots(dots, children)
+    tx.delete_dots(dots)
     return tx, anchor, wireds, dests, title
 
 
+def plan_dot_distribution(stamps, source, dots, leaves, index):
+    """Plan de build_dot_distribution, sin crear nada (ver new_plan)."""
+    plan = new_plan(derive_title(stamps, source), source)
+    for d in dots:
+        plan_cut(plan, d.input(0), d)
+        plan["removed"].append(node_rect(d))
+    for (dst, idx) in leaves:
+        plan_cut(plan, dst.input(idx), dst)
+        r = node_rect(dst)
+        plan_wired(plan, ghost_wired_rect(r), [r])
+    return plan
+
+
 # ----------------------------------------------------------------------
 # PASE 2: CONEXIONES LARGAS DIRECTAS (v0.01)
 # ----------------------------------------------------------------------
 
-def find_long_connections(stamps, threshold):
+def geometry_snapshot(nodes):
+    """Centros {nodo: (cx, cy)}, leyendo xpos/ypos/screenWidth/screenHeight
+    una sola vez por nodo."""
+    return dict((n, node_center(n)) for n in nodes)
+
+
+def edge_lengths(edges, centers):
+    """Largo entre centros de cada (origen, destino), en el mismo orden."""
+    if np is not None and len(edges) >= NUMPY_MIN_EDGES:
+        a = np.array([centers[src] for (src, dst) in edges], dtype=float)
+        b = np.array([centers[dst] for (src, dst) in edges], dtype=float)
+        d = a - b
+        return np.sqrt(d[:, 0] * d[:, 0] + d[:, 1] * d[:, 1]).tolist()
+    lengths = []
+    for (src, dst) in edges:
+        ax, ay = centers[src]
+        bx, by = centers[dst]
+        lengths.append(((ax - bx) ** 2 + (ay - by) ** 2) ** 0.5)
+    return lengths
+
+
+def find_long_connections(edges, threshold):
     """
-    Devuelve [(origen, destino, input_index, distancia), ...] para conexiones
-    directas (sin Dots ni Stamps de por medio) cuyo largo supere el threshold.
+    De las conexiones directas (origen, destino, input_index) relevadas por
+    scan_candidates (sin Dots ni Stamps de por medio), devuelve
+    [(origen, destino, input_index, distancia), ...] para las que superan el
+    threshold, de la mas larga a la mas corta.
     """
-    pairs = []
-    for node in nuke.allNodes():
-        if node.Class() in SKIP_CLASSES or node.Class() == "Dot":
-            continue
-        if is_stamp(stamps, node):
-            continue
-        for i in range(node.inputs()):
-            src = node.input(i)
-            if src is None:
-                continue
-            if src.Class() in SKIP_CLASSES or src.Class() == "Dot":
-                continue
-            if is_stamp(stamps, src):
-                continue
-            dist = node_distance(src, node)
-            if dist > threshold:
-                pairs.append((src, node, i, dist))
-                debug_print(
-                    "Conexion larga: {0} -> {1} (input {2}) dist={3:.0f}".format(
-                        src.name(), node.name(), i, dist
-                    )
+    centers = geometry_snapshot(set(n for (src, dst, _i) in edges for n in (src, dst)))
+    lengths = edge_lengths([(src, dst) for (src, dst, _i) in edges], centers)
+    pairs = [
+        (src, dst, i, dist)
+        for (src, dst, i), dist in zip(edges, lengths)
+        if dist > threshold
+    ]
+    pairs.sort(key=lambda p: -p[3])
+
+    if DEBUG:
+        for (src, dst, i, dist) in pairs:
+            debug_print(
+                "Conexion larga: {0} -> {1} (input {2}) dist={3:.0f}".format(
+                    src.name(), dst.name(), i, dist
                 )
+            )
     return pairs
 
 
-def build_long_connection(stamps, src, dst, input_index):
+def build_long_connection(stamps, src, dst, input_index, index):
     """Reemplaza una conexion directa larga por Anchor + Wired.
     NO muestra cartel ni revierte. Devuelve (tx, anchor, wireds, dests, title)."""
-    tx = GroupTx()
+    tx = GroupTx(index)
     anchor = create_anchor_below(stamps, src)
     tx.created(anchor)
     try:
@@ -1283,6 +1656,77 @@ def build_long_connection(stamps, src, dst, input_index):
     return tx, anchor, [wired], [dst], title
 
 
+def plan_long_connection(stamps, src, dst, input_index):
+    """Plan de build_long_connection, sin crear nada (ver new_plan)."""
+    plan = new_plan(derive_title(stamps, src), src)
+    plan_cut(plan, src, dst)
+    r = node_rect(dst)
+    plan_wired(plan, ghost_wired_rect(r), [r])
+    return plan
+
+
+# ----------------------------------------------------------------------
+# RELEVAMIENTO UNICO (los tres pases salen de la misma pasada)
+# ----------------------------------------------------------------------
+
+def scan_candidates(stamps, index, enabled_passes):
+    """
+    Recorre nuke.allNodes() UNA vez y clasifica cada nodo para los pases
+    habilitados. Devuelve (hidden_groups, dot_sources, long_edges):
+      - hidden_groups: [(source, pickups), ...] del pase 0.
+      - dot_sources: nodos origen con algun Dot de ruteo colgado (pase 1; los
+        arboles se recorren al llegar al pase, sobre el grafo de ese momento).
+      - long_edges: [(origen, destino, input_index), ...] directas (pase 2).
+    Los candidatos a hidden input salen del DepIndex (no se lee hide_input
+    de cada nodo). El input 0 de un pickup sigue en long_edges: se descarta
+    recien si el usuario acepta su grupo de hidden inputs (ver
+    replaced_by_hidden).
+    """
+    want_hidden = PASS_HIDDEN_INPUTS in enabled_passes
+    want_dots = PASS_DOT_DISTRIBUTIONS in enabled_passes
+    want_long = PASS_LONG_CONNECTIONS in enabled_passes
+
+    pickups = []
+    dot_roots = set()
+    eligible = []   # ni SKIP_CLASSES, ni Dot, ni Stamp (en orden de aparicion)
+    inputs = []     # (origen, destino, idx) de los elegibles, origen sin filtrar
+    for n in nuke.allNodes():
+        cls = n.Class()
+        if cls in SKIP_CLASSES:
+            continue
+        # index.pickups ya excluye Stamps; un Dot nunca es Stamp.
+        if want_hidden and n in index.pickups and has_hidden_input(n):
+            pickups.append(n)
+        if cls == "Dot":
+            if want_dots and is_routing_dot(n):
+                up = n.input(0)
+                if up is not None:
+                    dot_roots.add(up)
+            continue
+        if is_stamp(stamps, n):
+            continue
+        eligible.append(n)
+        if want_long:
+            for i in range(n.inputs()):
+                src = n.input(i)
+                if src is not None:
+                    inputs.append((src, n, i))
+
+    hgroups = group_hidden_pickups(stamps, pickups) if want_hidden else []
+    dot_sources = [n for n in eligible if n in dot_roots]
+    eligible_set = set(eligible)
+    long_edges = [(src, dst, i) for (src, dst, i) in inputs if src in eligible_set]
+    return hgroups, dot_sources, long_edges
+
+
+def replaced_by_hidden(src, dst, input_index, pickup_set, accepted):
+    """True si la conexion es el input 0 de un pickup cuyo grupo de hidden
+    inputs fue aceptado: ese grupo ya la reemplaza por un Wired."""
+    return (
+        input_index == 0 and dst in pickup_set and key_hidden(src) in accepted
+    )
+
+
 # ----------------------------------------------------------------------
 # KEYS / CLAVES DE GRUPO  (para casar decisiones entre preview y apply)
 # ----------------------------------------------------------------------
@@ -1304,72 +1748,91 @@ def key_long(src, dst, idx):
 # se recrean con referencias nuevas, asi que hay que volver a detectarlos)
 # ----------------------------------------------------------------------
 
-def redetect_hidden(stamps, source_name):
-    """Devuelve (children, source, pickups) para el grupo de hidden inputs de
+def hidden_group_names(hgroups):
+    """[(clave, nombre del origen), ...] leidos ANTES de procesar ningun grupo:
+    el origen puede ser un Dot con hide_input que otro grupo borra (y el
+    preview recrea), asi que despues solo se lo busca por nombre."""
+    return [(key_hidden(source), source.name()) for (source, _pickups) in hgroups]
+
+
+def redetect_hidden(index, source_name):
+    """Devuelve (source, pickups) para el grupo de hidden inputs de
     'source_name', o None si ya no existe."""
     source = nuke.toNode(source_name)
     if source is None:
         return None
-    children = build_children_map()
     pickups = [
-        n for n in find_hidden_inputs(stamps)
+        n for n in index.hidden_pickups()
         if n.input(0) is not None and n.input(0).name() == source_name
     ]
     if not pickups:
         return None
-    return children, source, pickups
+    return source, pickups
 
 
-def redetect_dots(stamps, source_name):
-    """Devuelve (children, source, dots, leaves) para el arbol de Dots de
+def redetect_dots(index, source_name):
+    """Devuelve (source, dots, leaves) para el arbol de Dots de
     'source_name', o None si ya no califica."""
     source = nuke.toNode(source_name)
     if source is None:
         return None
-    children = build_children_map()
-    dots, leaves = collect_dot_tree(source, children)
+    dots, leaves = collect_dot_tree(source, index)
     if len(leaves) < MIN_DESTINATIONS:
         return None
-    return children, source, dots, leaves
+    return source, dots, leaves
 
 
 # ----------------------------------------------------------------------
 # FASE 1: PREVIEW  (con undo deshabilitado) -> junta decisiones
 # ----------------------------------------------------------------------
 
-def preview_all(stamps, enabled_passes):
-    """Para cada grupo: construye los Stamps (re-detectables para el peek), hace
-    zoom, muestra el cartel y registra la decision. preview_group revierte cada
-    grupo. No se graba en el historial de undo (el llamador lo deshabilita).
+def preview_all(stamps, index, enabled_passes):
+    """Para cada grupo: muestra lo que haria (capa sobre el DAG con
+    OVERLAY_PREVIEW, o construyendo los Stamps re-detectables para el peek y
+    revirtiendolos), hace zoom, muestra el cartel y registra la decision.
+    No se graba en el historial de undo (el llamador lo deshabilita).
     Devuelve un dict {clave: titulo_elegido} solo para los aceptados."""
     decisions = {}
+    dag = find_dag_widget() if OVERLAY_PREVIEW else None
 
-    def handle(gkey, build_fn):
-        action, name, title = preview_group(build_fn)
+    def handle(gkey, build_fn, plan_fn):
+        if dag is not None:
+            action, name, title = preview_overlay(dag, plan_fn)
+        else:
+            action, name, title = preview_group(build_fn)
+        # Lo que el usuario haya editado con el cartel abierto.
+        index.rescan()
         if action in (ACTION_APPLY, ACTION_APPLY_AND_STOP):
             decisions[gkey] = name if name else title
         return action == ACTION_APPLY_AND_STOP
 
+    hgroups, dot_sources, long_edges = scan_candidates(stamps, index, enabled_passes)
+    pickup_set = set(p for (_source, pickups) in hgroups for p in pickups)
+
     # Pase 0: hidden inputs.
     if PASS_HIDDEN_INPUTS in enabled_passes:
-        _, hgroups = hidden_groups(stamps)
-        for (source, _pickups) in hgroups:
-            sname = source.name()
+        for (gkey, sname) in hidden_group_names(hgroups):
 
             def build_fn(sname=sname):
-                redet = redetect_hidden(stamps, sname)
+                redet = redetect_hidden(index, sname)
                 if redet is None:
                     return None
-                ch, s, p = redet
-                return build_hidden_group(stamps, s, p, ch)
+                s, p = redet
+                return build_hidden_group(stamps, s, p, index)
 
-            if handle(key_hidden(source), build_fn):
+            def plan_fn(sname=sname):
+                redet = redetect_hidden(index, sname)
+                if redet is None:
+                    return None
+                s, p = redet
+                return plan_hidden_group(stamps, s, p, index)
+
+            if handle(gkey, build_fn, plan_fn):
                 return decisions
 
     # Pase 1: distribuciones por Dots.
     if PASS_DOT_DISTRIBUTIONS in enabled_passes:
-        children = build_children_map()
-        trees = find_dot_distributions(stamps, children, MIN_DESTINATIONS)
+        trees = find_dot_distributions(dot_sources, index, MIN_DESTINATIONS)
         debug_print(
             "Pase 1 (distribuciones por Dots): {0} arbol/es.".format(len(trees))
         )
@@ -1377,20 +1840,29 @@ def preview_all(stamps, enabled_passes):
             sname = source.name()
 
             def build_fn(sname=sname):
-                redet = redetect_dots(stamps, sname)
+                redet = redetect_dots(index, sname)
+                if redet is None:
+                    return None
+                s, d, l = redet
+                return build_dot_distribution(stamps, s, d, l, index)
+
+            def plan_fn(sname=sname):
+                redet = redetect_dots(index, sname)
                 if redet is None:
                     return None
-                ch, s, d, l = redet
-                return build_dot_distribution(stamps, s, d, l, ch)
+                s, d, l = redet
+                return plan_dot_distribution(stamps, s, d, l, index)
 
-            if handle(key_dots(source), build_fn):
+            if handle(key_dots(source), build_fn, plan_fn):
                 return decisions
 
     # Pase 2: conexiones largas directas.
     if PASS_LONG_CONNECTIONS in enabled_passes:
-        pairs = find_long_connections(stamps, DISTANCE_THRESHOLD)
+        pairs = find_long_connections(long_edges, DISTANCE_THRESHOLD)
         debug_print("Pase 2 (conexiones largas): {0} conexion/es.".format(len(pairs)))
         for (src, dst, input_index, dist) in pairs:
+            if replaced_by_hidden(src, dst, input_index, pickup_set, decisions):
+                continue
             sname, dname, idx = src.name(), dst.name(), input_index
 
             def build_fn(sname=sname, dname=dname, idx=idx):
@@ -1398,9 +1870,16 @@ def preview_all(stamps, enabled_passes):
                 d = nuke.toNode(dname)
                 if s is None or d is None:
                     return None
-                return build_long_connection(stamps, s, d, idx)
+                return build_long_connection(stamps, s, d, idx, index)
+
+            def plan_fn(sname=sname, dname=dname, idx=idx):
+                s = nuke.toNode(sname)
+                d = nuke.toNode(dname)
+                if s is None or d is None:
+                    return None
+                return plan_long_connection(stamps, s, d, idx)
 
-            if handle(key_long(src, dst, input_index), build_fn):
+            if handle(key_long(src, dst, input_index), build_fn, plan_fn):
                 return decisions
 
     return decisions
@@ -1410,44 +1889,50 @@ def preview_all(stamps, enabled_passes):
 # FASE 2: APPLY  (con undo habilitado) -> re-aplica solo los aceptados
 # ----------------------------------------------------------------------
 
-def apply_all(stamps, accepted, enabled_passes):
+def apply_all(stamps, index, accepted, enabled_passes):
     """Re-detecta los grupos (el grafo volvio al original tras el preview) y
     aplica SOLO los que el usuario acepto, sin cartel. Devuelve la cantidad."""
     total = 0
+    hgroups, dot_sources, long_edges = scan_candidates(stamps, index, enabled_passes)
+    pickup_set = set(p for (_source, pickups) in hgroups for p in pickups)
 
     # Pase 0: hidden inputs.
     if PASS_HIDDEN_INPUTS in enabled_passes:
-        children, hgroups = hidden_groups(stamps)
-        for (source, pickups) in hgroups:
-            gkey = key_hidden(source)
-            if gkey in accepted:
-                tx, anchor, wireds, dests, title = build_hidden_group(
-                    stamps, source, pickups, children
-                )
-                apply_title(anchor, wireds, accepted[gkey])
-                total += 1
+        for (gkey, sname) in hidden_group_names(hgroups):
+            if gkey not in accepted:
+                continue
+            redet = redetect_hidden(index, sname)
+            if redet is None:
+                continue  # el origen era un Dot que un grupo anterior reemplazo
+            source, pickups = redet
+            tx, anchor, wireds, dests, title = build_hidden_group(
+                stamps, source, pickups, index
+            )
+            apply_title(anchor, wireds, accepted[gkey])
+            total += 1
 
     # Pase 1: distribuciones por Dots.
     if PASS_DOT_DISTRIBUTIONS in enabled_passes:
-        children = build_children_map()
-        trees = find_dot_distributions(stamps, children, MIN_DESTINATIONS)
+        trees = find_dot_distributions(dot_sources, index, MIN_DESTINATIONS)
         for (source, dots, leaves) in trees:
             gkey = key_dots(source)
             if gkey in accepted:
                 tx, anchor, wireds, dests, title = build_dot_distribution(
-                    stamps, source, dots, leaves, children
+                    stamps, source, dots, leaves, index
                 )
                 apply_title(anchor, wireds, accepted[gkey])
                 total += 1
 
     # Pase 2: conexiones largas directas.
     if PASS_LONG_CONNECTIONS in enabled_passes:
-        pairs = find_long_connections(stamps, DISTANCE_THRESHOLD)
+        pairs = find_long_connections(long_edges, DISTANCE_THRESHOLD)
         for (src, dst, input_index, dist) in pairs:
+            if replaced_by_hidden(src, dst, input_index, pickup_set, accepted):
+                continue  # el pickup ya cuelga de un Wired
             gkey = key_long(src, dst, input_index)
             if gkey in accepted:
                 tx, anchor, wireds, dests, title = build_long_connection(
-                    stamps, src, dst, input_index
+                    stamps, src, dst, input_index, index
                 )
                 apply_title(anchor, wireds, accepted[gkey])
                 total += 1
@@ -1474,13 +1959,16 @@ def main():
     stamps.Stamps_LockCallbacks = True
 
     try:
+        # Un solo relevamiento del script; preview y apply lo mantienen al dia.
+        index = DepIndex(stamps)
+
         # FASE 1: preview con undo DESHABILITADO. Todo lo que se crea/revierte
         # aca NO entra al historial de undo (asi los grupos cancelados no dejan
         # "basura" que luego, al hacer Ctrl+Z, dispara la avalancha de errores
         # de los callbacks de stamps al recrear nodos).
         nuke.Undo().disable()
         try:
-            decisions = preview_all(stamps, enabled_passes)
+            decisions = preview_all(stamps, index, enabled_passes)
         finally:
             nuke.Undo().enable()
 
@@ -1488,11 +1976,14 @@ def main():
             debug_print("LGA_AutoStamps: no se aplico ningun reemplazo.")
             return
 
+        # El apply re-detecta sobre el script tal como quedo tras el preview.
+        index.rescan()
+
         # FASE 2: apply con un unico nuke.Undo(). Solo creaciones limpias de los
         # grupos aceptados -> un solo Ctrl+Z deshace todo sin avalancha.
         nuke.Undo().begin("LGA_AutoStamps")
         try:
-            total = apply_all(stamps, decisions, enabled_passes)
+            total = apply_all(stamps, index, decisions, enabled_passes)
         finally:
             nuke.Undo().end()
     finally:
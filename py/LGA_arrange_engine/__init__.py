@@ -0,0 +1,26 @@
+"""
+LGA arrange engine: Nuke-independent layout shared by LGA_arrangeNodes (Nuke adapter)
+and the offline prep/benchmark tools in tools/LGA_Arrange_Prep.
+"""
+
+from LGA_arrange_engine.model import (  # noqa: F401
+    ANY_EDGE,
+    CONVERGENCE_TOL,
+    MIN_GAP,
+    MIN_GAP_FLOOR,
+    OVERLAP_NODE_GAP,
+    TOLERANCE_X,
+    Edge,
+    Graph,
+    NodeModel,
+)
+from LGA_arrange_engine.layout import (  # noqa: F401
+    assign_columns,
+    column_label,
+    layout,
+    log_arrange_checks,
+    log_column_flows,
+    mark_align_edges,
+    sweep_clusters,
+)
+from LGA_arrange_engine.profiling import NULL_PROFILER, LayoutProfiler  # noqa: F401
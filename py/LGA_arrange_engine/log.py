@@ -0,0 +1,178 @@
+"""
+Logging for the arrange engine (see Docu_Logging_System.md).
+Writes to logs/debugPy_<name>.log through a queue listener; switches are set by configure().
+"""
+
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+import os
+import time
+
+# Off by default so CLI tools stay quiet; adapters (LGA_arrangeNodes) call configure().
+DEBUG = False
+DEBUG_CONSOLE = False
+DEBUG_LOG = True
+DEBUG_VERBOSE = False
+LOG_NAME = "arrangeEngine"
+
+script_start_time = None
+debug_log_listener = None
+debug_logger = None
+
+
+class RelativeTimeFormatter(logging.Formatter):
+    """Formatter that includes relative time since script start."""
+    def format(self, record):
+        global script_start_time
+        if script_start_time is None:
+            script_start_time = record.created
+        relative_time = record.created - script_start_time
+        record.relative_time = f"{relative_time:.3f}s"
+        return super().format(record)
+
+
+def setup_debug_logging(script_name=LOG_NAME):
+    """Configure logging to write ONLY to file (no console)."""
+    global debug_log_listener
+
+    log_filename = f"debugPy_{script_name}.log"
+    log_file_path = os.path.join(
+        os.path.dirname(__file__), "..", "..", "logs", log_filename
+    )
+
+    os.makedirs(os.path.dirname(log_file_path), exist_ok=True)
+
+    if os.path.exists(log_file_path):
+        try:
+            with open(log_file_path, "w", encoding="utf-8") as f:
+                f.write("")
+        except Exception as exc:
+            print(f"Warning: could not clear log: {exc}")
+
+    logger_name = f"{script_name.lower()}_logger"
+    logger = logging.getLogger(logger_name)
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+
+    if logger.handlers:
+        logger.handlers.clear()
+
+    file_handler = logging.FileHandler(log_file_path, encoding="utf-8")
+    file_handler.setLevel(logging.DEBUG)
+    formatter = RelativeTimeFormatter("[%(relative_time)s] %(message)s")
+    file_handler.setFormatter(formatter)
+
+    log_queue = queue.Queue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.setLevel(logging.DEBUG)
+    logger.addHandler(queue_handler)
+
+    if debug_log_listener:
+        try:
+            debug_log_listener.stop()
+        except Exception:
+            pass
+
+    debug_log_listener = QueueListener(
+        log_queue, file_handler, respect_handler_level=True
+    )
+    debug_log_listener.daemon = True
+    debug_log_listener.start()
+
+    return logger
+
+
+def configure(
+    debug: Optional[bool] = None,
+    console: Optional[bool] = None,
+    log_file: Optional[bool] = None,
+    verbose: Optional[bool] = None,
+    name: Optional[str] = None,
+) -> None:
+    """Set the logging switches (None keeps the current value)."""
+    global DEBUG, DEBUG_CONSOLE, DEBUG_LOG, DEBUG_VERBOSE, LOG_NAME
+    if debug is not None:
+        DEBUG = debug
+    if console is not None:
+        DEBUG_CONSOLE = console
+    if log_file is not None:
+        DEBUG_LOG = log_file
+    if verbose is not None:
+        DEBUG_VERBOSE = verbose
+    if name is not None:
+        LOG_NAME = name
+
+
+def init_logging() -> None:
+    """(Re)start the log file for a new run: the previous content is cleared."""
+    global debug_logger
+    if DEBUG and DEBUG_LOG:
+        debug_logger = setup_debug_logging(script_name=LOG_NAME)
+
+
+def debug_enabled(verbose: bool = False) -> bool:
+    """True when debug_print (or debug_print_verbose) would emit anything."""
+    if verbose and not DEBUG_VERBOSE:
+        return False
+    return DEBUG and (DEBUG_LOG or DEBUG_CONSOLE)
+
+
+def debug_print(*message, level="info"):
+    """
+    Logging helper with console/file switches.
+    Callable arguments (e.g. lambda: f"...") are only evaluated when logging is enabled,
+    so hot loops can log without paying for the formatting in production.
+    """
+    global script_start_time
+    if not debug_enabled():
+        return
+    msg = " ".join(str(arg() if callable(arg) else arg) for arg in message)
+
+    if DEBUG and DEBUG_LOG:
+        if debug_logger is None:
+            init_logging()
+        if script_start_time is None:
+            script_start_time = time.time()
+        if level == "debug":
+            debug_logger.debug(msg)
+        elif level == "warning":
+            debug_logger.warning(msg)
+        elif level == "error":
+            debug_logger.error(msg)
+        else:
+            debug_logger.info(msg)
+
+    if DEBUG and DEBUG_CONSOLE:
+        if script_start_time is None:
+            script_start_time = time.time()
+        relative_time = time.time() - script_start_time
+        timestamped_msg = f"[{relative_time:.3f}s] {msg}"
+        print(timestamped_msg)
+
+
+def debug_print_verbose(*message, level="info"):
+    """Verbose logging helper (only when DEBUG_VERBOSE is True)."""
+    if not debug_enabled(verbose=True):
+        return
+    debug_print(*message, level=level)
+
+
+def cleanup_logging():
+    """Stop the logging listener on exit."""
+    global debug_log_listener
+    if debug_log_listener:
+        try:
+            debug_print("Deteniendo listener de logging...")
+            debug_log_listener.stop()
+            debug_print("Listener detenido")
+        except Exception as exc:
+            debug_print(f"Error en cleanup: {exc}", level="error")
+
+
+try:
+    import atexit
+    atexit.register(cleanup_logging)
+except Exception:
+    pass
@@ -0,0 +1,163 @@
+"""
+Graph model of the arrange engine: nodes, edges and the column/adjacency caches.
+Coordinates are node centers with Y up; defaults are in Nuke DAG pixels.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+import sys
+
+TOLERANCE_X = 55  # pixels for column grouping
+MIN_GAP = 10      # pixels minimum gap between node boxes
+# Layout passes stop early once no node moves more than this (px) between passes.
+CONVERGENCE_TOL = 0.5
+# Compresión mínima permitida cuando no hay espacio (en px).
+MIN_GAP_FLOOR = 3
+# Fixed gap between the bottom edge of the upper branch and
+# the top edge of the lower branch when resolving overlaps.
+OVERLAP_NODE_GAP = 30
+
+# __slots__ for the per-node/per-edge records (no instance __dict__: less memory and faster
+# attribute access on big graphs). dataclass(slots=...) needs Python 3.10+ (Nuke 15+).
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**_SLOTS)
+class NodeModel:
+    name: str
+    column: str
+    order: int
+    klass: str = ""
+    height: float = 20.0
+    x: float = 0.0
+    y: float = 0.0
+    ref: Optional[object] = None
+    fixed_y: bool = False
+    original_y: Optional[float] = None
+    original_x: Optional[float] = None
+
+
+@dataclass(**_SLOTS)
+class Edge:
+    src: str
+    dst: str
+    kind: str = "flow"
+    align: bool = False  # alignment constraint across columns
+
+
+# Adjacency key for "every edge, whatever its kind" (see Graph.edges_of).
+ANY_EDGE = "*"
+
+
+@dataclass
+class Graph:
+    nodes: Dict[str, NodeModel] = field(default_factory=dict)
+    edges: List[Edge] = field(default_factory=list)
+    principal_column: Optional[str] = None
+    column_positions: Dict[str, float] = field(default_factory=dict)
+    auto_columns: bool = True
+    tolerance_x: float = TOLERANCE_X
+    # Unit-dependent layout settings (defaults in Nuke px; the prep tools use graph units).
+    min_gap_floor: float = MIN_GAP_FLOOR
+    overlap_gap: float = OVERLAP_NODE_GAP
+    convergence_tol: float = CONVERGENCE_TOL
+    # Persistent column index (column -> nodes by order) and per-column subgroup cache.
+    # Both are rebuilt lazily after invalidate_columns(); see cache_stats for hits/rebuilds.
+    _column_index: Optional[Dict[str, List[NodeModel]]] = field(default=None, init=False, repr=False)
+    _subgroup_cache: Dict[str, List[List[NodeModel]]] = field(default_factory=dict, init=False, repr=False)
+    cache_stats: Dict[str, int] = field(default_factory=dict, init=False, repr=False)
+    # Per-node edge adjacency: name -> key -> edges (in graph.edges order).
+    # Keys are the edge kind (flow/mask/A/B), "align" for align edges and ANY_EDGE for all.
+    _edges_out: Optional[Dict[str, Dict[str, List[Edge]]]] = field(default=None, init=False, repr=False)
+    _edges_in: Optional[Dict[str, Dict[str, List[Edge]]]] = field(default=None, init=False, repr=False)
+    _edges_any: Optional[Dict[str, Dict[str, List[Edge]]]] = field(default=None, init=False, repr=False)
+    # Layout iterations actually run by the last layout() call (<= max_iters).
+    iterations_used: int = field(default=0, init=False, repr=False)
+
+    def add_node(self, node: NodeModel) -> None:
+        self.nodes[node.name] = node
+        if node.column not in self.column_positions:
+            self.column_positions[node.column] = node.x
+        self.invalidate_columns()
+
+    def add_edge(self, edge: Edge) -> None:
+        self.edges.append(edge)
+        self._subgroup_cache.clear()
+        if self._edges_any is not None:
+            self._index_edge(edge)
+
+    def invalidate_columns(self) -> None:
+        """Drop the column index and subgroup cache (call after changing node.column/order)."""
+        self._column_index = None
+        self._subgroup_cache.clear()
+
+    def invalidate_edges(self) -> None:
+        """Drop the edge adjacency (call after replacing graph.edges or changing kind/align)."""
+        self._edges_out = None
+        self._edges_in = None
+        self._edges_any = None
+        self._subgroup_cache.clear()
+
+    def _index_edge(self, edge: Edge) -> None:
+        keys = (ANY_EDGE, edge.kind, "align") if edge.align else (ANY_EDGE, edge.kind)
+        for key in keys:
+            self._edges_out.setdefault(edge.src, {}).setdefault(key, []).append(edge)
+            self._edges_in.setdefault(edge.dst, {}).setdefault(key, []).append(edge)
+            self._edges_any.setdefault(edge.src, {}).setdefault(key, []).append(edge)
+            if edge.dst != edge.src:
+                self._edges_any.setdefault(edge.dst, {}).setdefault(key, []).append(edge)
+
+    def _edge_lookup(self, index_name: str, name: str, kind: str) -> List[Edge]:
+        if self._edges_any is None:
+            self._edges_out = {}
+            self._edges_in = {}
+            self._edges_any = {}
+            for edge in self.edges:
+                self._index_edge(edge)
+        by_kind = getattr(self, index_name).get(name)
+        if not by_kind:
+            return []
+        return by_kind.get(kind, [])
+
+    def edges_out(self, name: str, kind: str = ANY_EDGE) -> List[Edge]:
+        """Edges whose src is `name` (read-only)."""
+        return self._edge_lookup("_edges_out", name, kind)
+
+    def edges_in(self, name: str, kind: str = ANY_EDGE) -> List[Edge]:
+        """Edges whose dst is `name` (read-only)."""
+        return self._edge_lookup("_edges_in", name, kind)
+
+    def edges_of(self, name: str, kind: str = ANY_EDGE) -> List[Edge]:
+        """Edges touching `name` in either direction, in graph.edges order (read-only)."""
+        return self._edge_lookup("_edges_any", name, kind)
+
+    def reset_cache_stats(self) -> None:
+        self.cache_stats = {
+            "columns_hits": 0,
+            "columns_rebuilds": 0,
+            "subgroups_hits": 0,
+            "subgroups_rebuilds": 0,
+        }
+
+    def _count(self, key: str) -> None:
+        self.cache_stats[key] = self.cache_stats.get(key, 0) + 1
+
+    def columns(self) -> Dict[str, List[NodeModel]]:
+        """Column -> nodes sorted by order. Lists are shared with the cache: read-only."""
+        if self._column_index is None:
+            self._count("columns_rebuilds")
+            cols: Dict[str, List[NodeModel]] = {}
+            for node in self.nodes.values():
+                cols.setdefault(node.column, []).append(node)
+            for col in cols:
+                cols[col].sort(key=lambda n: n.order)
+            self._column_index = cols
+        else:
+            self._count("columns_hits")
+        return dict(self._column_index)
+
+    def column_nodes(self, column: Optional[str]) -> List[NodeModel]:
+        """Nodes of a single column sorted by order (read-only, shared with the cache)."""
+        if column is None:
+            return []
+        return self.columns().get(column, [])
@@ -0,0 +1,91 @@
+"""
+Timing spans and counters for layout() passes, dumpable as JSON or Chrome trace format.
+"""
+
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List
+import json
+import time
+
+
+class LayoutProfiler:
+    """Collects nested timing spans and counters for one arrange run."""
+
+    def __init__(self):
+        self.spans: List[dict] = []
+        self.counters: Dict[str, int] = {}
+        self._start = time.perf_counter()
+        self._depth = 0
+
+    @contextmanager
+    def span(self, name: str, **args):
+        start = time.perf_counter()
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            self.spans.append(
+                {
+                    "name": name,
+                    "start": start - self._start,
+                    "dur": time.perf_counter() - start,
+                    "depth": self._depth,
+                    "args": args,
+                }
+            )
+
+    def count(self, key: str, amount: int = 1) -> None:
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def summary(self) -> Dict[str, dict]:
+        """Per span name: calls, total and max seconds."""
+        out: Dict[str, dict] = {}
+        for sp in self.spans:
+            entry = out.setdefault(sp["name"], {"calls": 0, "total_s": 0.0, "max_s": 0.0})
+            entry["calls"] += 1
+            entry["total_s"] += sp["dur"]
+            entry["max_s"] = max(entry["max_s"], sp["dur"])
+        return out
+
+    def to_json(self) -> dict:
+        spans = sorted(self.spans, key=lambda sp: sp["start"])
+        return {"summary": self.summary(), "counters": dict(self.counters), "spans": spans}
+
+    def to_chrome_trace(self) -> dict:
+        events = [
+            {
+                "name": sp["name"],
+                "ph": "X",
+                "ts": round(sp["start"] * 1e6, 3),
+                "dur": round(sp["dur"] * 1e6, 3),
+                "pid": 1,
+                "tid": 1,
+                "args": sp["args"],
+            }
+            for sp in sorted(self.spans, key=lambda sp: sp["start"])
+        ]
+        events.append(
+            {"name": "counters", "ph": "C", "ts": 0, "pid": 1, "tid": 1, "args": dict(self.counters)}
+        )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def dump(self, path: str, fmt: str = "json") -> None:
+        data = self.to_chrome_trace() if fmt == "chrome" else self.to_json()
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=1)
+
+
+class _NullProfiler:
+    """Stand-in used when profiling is off: spans and counters cost a call and nothing else."""
+
+    _null = nullcontext()
+
+    def span(self, name: str, **args):
+        return self._null
+
+    def count(self, key: str, amount: int = 1) -> None:
+        pass
+
+
+NULL_PROFILER = _NullProfiler()
@@ -101,13 +101,20 @@ def setup_debug_logging(script_name="LGA_layoutPanel"):
     return logger
 
 
-debug_logger = setup_debug_logging(script_name="LGA_layoutPanel")
+debug_logger = setup_debug_logging(script_name="LGA_layoutPanel") if DEBUG and DEBUG_LOG else None
+
+
+def debug_enabled():
+    return DEBUG and (DEBUG_LOG or DEBUG_CONSOLE)
 
 
 def debug_print(*message, level="info"):
     global script_start_time
 
-    msg = " ".join(str(arg) for arg in message)
+    # Nothing is formatted when logging is off; callable args are evaluated lazily.
+    if not debug_enabled():
+        return
+    msg = " ".join(str(arg() if callable(arg) else arg) for arg in message)
 
     if DEBUG and DEBUG_LOG:
         if script_start_time is None:
@@ -1,5 +1,5 @@
 """
-Apply layout_core to a graph JSON and export DOT.
+Apply layout_core to a graph JSON (or binary .lgag) and export DOT.
 """
 
 from pathlib import Path
@@ -7,9 +7,9 @@ import sys
 
 sys.path.append(str(Path(__file__).resolve().parent))
 
-from graph_io import load_graph_json, save_graph_json
+from graph_io import is_binary_graph, load_graph, save_graph
 import re
-from graphviz_export import to_dot
+from graphviz_export import save_dot
 from layout_core import layout
 
 
@@ -22,15 +22,15 @@ def main() -> None:
     out_path = sys.argv[2]
     min_gap = float(sys.argv[3]) if len(sys.argv) > 3 else 0.2
 
-    graph = load_graph_json(in_path)
+    graph = load_graph(in_path)
     layout(graph, min_gap=min_gap)
     raw_title = Path(in_path).stem + "_after"
     safe_title = re.sub(r"[^A-Za-z0-9_]", "_", raw_title) or "Graph"
-    dot = to_dot(graph, title=safe_title)
-    Path(out_path).write_text(dot, encoding="utf-8")
+    save_dot(graph, out_path, title=safe_title)
 
-    arranged_json_path = Path(in_path).with_suffix(".arranged.json")
-    save_graph_json(graph, str(arranged_json_path))
+    # Arranged output keeps the input's format.
+    suffix = ".arranged.lgag" if is_binary_graph(in_path) else ".arranged.json"
+    save_graph(graph, str(Path(in_path).with_suffix(suffix)))
 
 
 if __name__ == "__main__":
@@ -2,16 +2,21 @@
 Convert .nk file to layout_core.Graph JSON.
 """
 
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
 from pathlib import Path
+import argparse
 import sys
 
 sys.path.append(str(Path(__file__).resolve().parent))
 
-from typing import Dict, List
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-from layout_core import Graph, Node, Edge
-from nk_parser import parse_nk, NkNode, _parse_inputs_spec
-from graph_io import save_graph_json
+from layout_core import Graph, Node, Edge, layout, sweep_clusters
+from nk_cache import parse_nk_cached
+from nk_parser import NkGraph, NkNode, _parse_inputs_spec
+from graph_io import save_graph
 
 
 CLASS_BASE_HEIGHTS = {
@@ -40,7 +45,7 @@ DEFAULT_HEIGHT_PX = 20
 
 def _estimate_height(node: NkNode) -> float:
     if node.klass.startswith("Dot"):
-        size = node.knobs.get("size")
+        size = node.knob("size")
         if size is not None:
             try:
                 val = float(size)
@@ -58,20 +63,14 @@ def _estimate_height(node: NkNode) -> float:
 
 
 def _group_columns(nodes: List[Node], tolerance_x: float) -> Dict[str, float]:
+    nodes = sorted(nodes, key=lambda n: n.x)
     groups: List[List[Node]] = []
     centers: List[float] = []
-
-    for node in sorted(nodes, key=lambda n: n.x):
-        placed = False
-        for i, cx in enumerate(centers):
-            if abs(node.x - cx) <= tolerance_x:
-                groups[i].append(node)
-                centers[i] = sum(n.x for n in groups[i]) / len(groups[i])
-                placed = True
-                break
-        if not placed:
-            groups.append([node])
-            centers.append(node.x)
+    start = 0
+    for cx, size in sweep_clusters([n.x for n in nodes], tolerance_x):
+        groups.append(nodes[start:start + size])
+        centers.append(cx)
+        start += size
 
     # Assign column names ordered left to right
     ordered = sorted(zip(centers, groups), key=lambda t: t[0])
@@ -88,6 +87,89 @@ def _group_columns(nodes: List[Node], tolerance_x: float) -> Dict[str, float]:
     return {f"C{idx}": cx for idx, (cx, _grp) in enumerate(ordered)}
 
 
+class _ColumnIndex:
+    """
+    Per-column nodes sorted by y, for the nearest / best-score queries of merge inference.
+    Queries walk outward from a bisect point and stop once |dy| alone exceeds the best score,
+    so they touch only the nodes near the Merge instead of the whole graph. Ties go to the
+    node that comes first in graph order, as min() over graph.nodes would pick.
+    """
+
+    def __init__(self, graph: Graph, col_order: Dict[str, int]) -> None:
+        self.order = {name: idx for idx, name in enumerate(graph.nodes)}
+        self.columns = sorted(col_order, key=lambda col: col_order[col])
+        self.rank = {col: idx for idx, col in enumerate(self.columns)}
+        self._all: Dict[str, List[Node]] = {}
+        for node in graph.nodes.values():
+            self._all.setdefault(node.column, []).append(node)
+        for col_nodes in self._all.values():
+            col_nodes.sort(key=lambda n: (n.y, self.order[n.name]))
+        self._filtered: Dict[Any, Tuple[List[float], List[Node]]] = {}
+
+    def _sorted(self, col: str, kind: str) -> Tuple[List[float], List[Node]]:
+        key = (col, kind)
+        entry = self._filtered.get(key)
+        if entry is None:
+            nodes = self._all.get(col, [])
+            if kind == "non_merge":
+                nodes = [n for n in nodes if not n.klass.startswith("Merge")]
+            elif kind == "non_dot":
+                nodes = [n for n in nodes if not n.klass.startswith("Dot")]
+            entry = ([n.y for n in nodes], nodes)
+            self._filtered[key] = entry
+        return entry
+
+    def split(self, col: str) -> Tuple[List[str], List[str], List[str]]:
+        """Columns left of, equal to and right of col (by column X order)."""
+        k = self.rank.get(col, 0)
+        return self.columns[:k], [col], self.columns[k + 1:]
+
+    def has_above(self, cols: List[str], y: float, exclude: Optional[str] = None) -> bool:
+        for col in cols:
+            ys, nodes = self._sorted(col, "all")
+            for n in nodes[bisect_left(ys, y):]:
+                if n.name != exclude:
+                    return True
+        return False
+
+    def best(
+        self,
+        cols: List[str],
+        y: float,
+        score: Callable[[Node], float],
+        kind: str = "all",
+        above: bool = False,
+        exclude: Optional[str] = None,
+    ) -> Optional[Node]:
+        """
+        Node with the lowest score in cols (only n.y >= y when above). score(n) must be
+        >= abs(n.y - y), which is what lets the walk stop early.
+        """
+        best_node: Optional[Node] = None
+        best_key: Optional[Tuple[float, int]] = None
+        for col in cols:
+            ys, nodes = self._sorted(col, kind)
+            start = bisect_left(ys, y)
+            sides = [range(start, len(nodes))]
+            if not above:
+                sides.append(range(start - 1, -1, -1))
+            for side in sides:
+                for i in side:
+                    n = nodes[i]
+                    if best_key is not None and abs(n.y - y) > best_key[0]:
+                        break
+                    if n.name == exclude:
+                        continue
+                    key = (score(n), self.order[n.name])
+                    if best_key is None or key < best_key:
+                        best_key = key
+                        best_node = n
+        return best_node
+
+    def nearest(self, cols: List[str], y: float, **kwargs: Any) -> Optional[Node]:
+        return self.best(cols, y, lambda n: abs(n.y - y), **kwargs)
+
+
 def _normalize_merge_inputs_by_position(graph: Graph, nk_nodes: Dict[str, NkNode]) -> None:
     """
     Reclassify/complete Merge inputs by spatial position.
@@ -101,6 +183,7 @@ def _normalize_merge_inputs_by_position(graph: Graph, nk_nodes: Dict[str, NkNode
     # Column X order
     col_x = {col: sum(n.x for n in nodes) / len(nodes) for col, nodes in cols.items()}
     col_order = {col: idx for idx, (col, _x) in enumerate(sorted(col_x.items(), key=lambda kv: kv[1]))}
+    index = _ColumnIndex(graph, col_order)
 
     # Build incoming edges map (from original edges)
     incoming: Dict[str, List[Edge]] = {}
@@ -122,10 +205,6 @@ def _normalize_merge_inputs_by_position(graph: Graph, nk_nodes: Dict[str, NkNode
             cur = candidates[0]
         return cur
 
-    def nearest_in_column(col: str, target_y: float) -> Node:
-        nodes = cols.get(col, [])
-        return min(nodes, key=lambda n: abs(n.y - target_y)) if nodes else None
-
     merge_names = {n.name for n in graph.nodes.values() if n.klass.startswith("Merge")}
     new_edges: List[Edge] = [e for e in graph.edges if e.dst not in merge_names]
 
@@ -136,53 +215,38 @@ def _normalize_merge_inputs_by_position(graph: Graph, nk_nodes: Dict[str, NkNode
         if not nk_node:
             continue
         mandatory, mask = _parse_inputs_spec(nk_node.inputs_spec, nk_node.klass)
-        inc = incoming.get(node.name, [])
-
-        # Candidate pools
-        same_col = [n for n in graph.nodes.values() if n.column == node.column and n.name != node.name]
-        left_candidates = [n for n in graph.nodes.values() if col_order.get(n.column, 0) < col_order.get(node.column, 0)]
-        right_candidates = [n for n in graph.nodes.values() if col_order.get(n.column, 0) > col_order.get(node.column, 0)]
+        left_cols, same_cols, right_cols = index.split(node.column)
 
-        # Prefer candidates above (higher y in graph coords)
-        same_above = [n for n in same_col if n.y >= node.y]
-        left_above = [n for n in left_candidates if n.y >= node.y]
-
-        # Select A (left, close in Y)
+        # Select A (left, close in Y; prefer candidates above = higher y in graph coords)
         a_thresh = max(1.5, node.height * 3.0)
-        a_candidates = left_above if left_above else left_candidates
-        a = None
-        if a_candidates:
-            cand = min(a_candidates, key=lambda n: abs(n.y - node.y))
-            if abs(cand.y - node.y) <= a_thresh:
-                a = cand
+        a = index.nearest(left_cols, node.y, above=index.has_above(left_cols, node.y))
+        if a is not None and abs(a.y - node.y) > a_thresh:
+            a = None
 
         # Select B (same column)
-        b_candidates = same_above if same_above else same_col
+        b_above = index.has_above(same_cols, node.y, exclude=node.name)
         b = None
-        if b_candidates:
-            if a is None:
-                non_merge = [n for n in b_candidates if not n.klass.startswith("Merge")]
-                pool = non_merge if non_merge else b_candidates
-            else:
-                pool = b_candidates
-            b = min(pool, key=lambda n: abs(n.y - node.y))
+        if a is None:
+            b = index.nearest(same_cols, node.y, kind="non_merge", above=b_above, exclude=node.name)
+        if b is None:
+            b = index.nearest(same_cols, node.y, above=b_above, exclude=node.name)
 
         # Select mask (right, balance Y + X; prefer nearby dots)
         m = None
-        if mask > 0 and right_candidates:
+        if mask > 0 and right_cols:
             def mask_score(n: Node) -> float:
                 y_dist = abs(n.y - node.y)
                 x_dist = abs(n.x - node.x)
                 dot_bonus = 0.0 if n.klass.startswith("Dot") else 0.2
                 return y_dist + 0.5 * x_dist + dot_bonus
 
-            m = min(right_candidates, key=mask_score)
+            m = index.best(right_cols, node.y, mask_score)
             if m and m.klass.startswith("Dot"):
                 dot_thresh = max(0.6, node.height * 1.5)
                 if abs(m.y - node.y) > dot_thresh:
-                    non_dots = [n for n in right_candidates if not n.klass.startswith("Dot")]
-                    if non_dots:
-                        m = min(non_dots, key=mask_score)
+                    non_dot = index.best(right_cols, node.y, mask_score, kind="non_dot")
+                    if non_dot:
+                        m = non_dot
                     else:
                         src_name = resolve_dot_source(m.name)
                         if src_name in graph.nodes:
@@ -197,6 +261,7 @@ def _normalize_merge_inputs_by_position(graph: Graph, nk_nodes: Dict[str, NkNode
             new_edges.append(Edge(m.name, node.name, kind="mask", align=True))
 
     graph.edges = new_edges
+    graph.invalidate_edges()
 
 
 def _adjust_merge_inputs_with_spatial_guard(
@@ -221,6 +286,7 @@ def _adjust_merge_inputs_with_spatial_guard(
     merge_names = {n.name for n in graph.nodes.values() if n.klass.startswith("Merge")}
     if not merge_names:
         return
+    index = _ColumnIndex(graph, col_order)
 
     def resolve_dot_source(name: str) -> str:
         cur = name
@@ -250,50 +316,37 @@ def _adjust_merge_inputs_with_spatial_guard(
         mandatory, mask = _parse_inputs_spec(nk_node.inputs_spec, nk_node.klass)
         inc = incoming.get(node.name, [])
         existing = {e.kind: e for e in inc}
-
-        # Candidate pools
-        same_col = [n for n in graph.nodes.values() if n.column == node.column and n.name != node.name]
-        left_candidates = [n for n in graph.nodes.values() if col_order.get(n.column, 0) < col_order.get(node.column, 0)]
-        right_candidates = [n for n in graph.nodes.values() if col_order.get(n.column, 0) > col_order.get(node.column, 0)]
-
-        same_above = [n for n in same_col if n.y >= node.y]
-        left_above = [n for n in left_candidates if n.y >= node.y]
+        left_cols, same_cols, right_cols = index.split(node.column)
 
         # Spatial candidates
         a_thresh = max(1.5, node.height * 3.0)
         b_thresh = max(1.5, node.height * 3.0)
         m_thresh = max(0.6, node.height * 1.5)
 
-        a_candidates = left_above if left_above else left_candidates
-        a = None
-        if a_candidates:
-            cand = min(a_candidates, key=lambda n: abs(n.y - node.y))
-            if is_close(cand, node, a_thresh):
-                a = cand
+        a = index.nearest(left_cols, node.y, above=index.has_above(left_cols, node.y))
+        if a is not None and not is_close(a, node, a_thresh):
+            a = None
 
-        b_candidates = same_above if same_above else same_col
-        b = None
-        if b_candidates:
-            non_merge = [n for n in b_candidates if not n.klass.startswith("Merge")]
-            pool = non_merge if non_merge else b_candidates
-            cand = min(pool, key=lambda n: abs(n.y - node.y))
-            b = cand
+        b_above = index.has_above(same_cols, node.y, exclude=node.name)
+        b = index.nearest(same_cols, node.y, kind="non_merge", above=b_above, exclude=node.name)
+        if b is None:
+            b = index.nearest(same_cols, node.y, above=b_above, exclude=node.name)
 
         m = None
-        if mask > 0 and right_candidates and (allow_new_mask or "mask" in existing):
+        if mask > 0 and right_cols and (allow_new_mask or "mask" in existing):
             def mask_score(n: Node) -> float:
                 y_dist = abs(n.y - node.y)
                 x_dist = abs(n.x - node.x)
                 dot_bonus = 0.0 if n.klass.startswith("Dot") else 0.2
                 return y_dist + 0.5 * x_dist + dot_bonus
 
-            cand = min(right_candidates, key=mask_score)
+            cand = index.best(right_cols, node.y, mask_score)
             if cand and is_close(cand, node, m_thresh):
                 m = cand
                 if m.klass.startswith("Dot") and abs(m.y - node.y) > m_thresh:
-                    non_dots = [n for n in right_candidates if not n.klass.startswith("Dot")]
-                    if non_dots:
-                        m = min(non_dots, key=mask_score)
+                    non_dot = index.best(right_cols, node.y, mask_score, kind="non_dot")
+                    if non_dot:
+                        m = non_dot
                     else:
                         src_name = resolve_dot_source(m.name)
                         if src_name in graph.nodes:
@@ -318,20 +371,22 @@ def _adjust_merge_inputs_with_spatial_guard(
             new_edges.append(Edge(m_sel.name, node.name, kind="mask", align=True))
 
     graph.edges = new_edges
+    graph.invalidate_edges()
 
 
-def nk_to_graph(
-    nk_path: str,
+def nk_graph_to_graph(
+    nk_graph: NkGraph,
     scale: float = 0.05,
     tolerance_x: float = 2.5,
-    return_meta: bool = False,
     infer_merge_inputs: bool = False,
-):
-    nk_graph = parse_nk(nk_path)
+) -> Graph:
+    """
+    Build a layout graph from one parsed scope (top level or a single Group body).
+    infer_merge_inputs: replace stack-derived Merge inputs that are not spatially plausible.
+    """
     graph = Graph()
 
-    name_to_inputs = {}
-    nk_nodes_by_name = {n.name: n for n in nk_graph.nodes}
+    nodes: List[Node] = []
     for nk_node in nk_graph.nodes:
         width_px = CLASS_WIDTH_PX.get(nk_node.klass, DEFAULT_WIDTH_PX)
         height_px = CLASS_HEIGHT_PX.get(nk_node.klass, DEFAULT_HEIGHT_PX)
@@ -347,40 +402,168 @@ def nk_to_graph(
             y=center_y,
             height=height,
         )
+        nodes.append(node)
+
+    # Columns are assigned before add_node so column_positions matches a JSON reload.
+    _group_columns(nodes, tolerance_x=tolerance_x)
+    for node in nodes:
         graph.add_node(node)
-        name_to_inputs[nk_node.name] = nk_node.inputs_spec
 
     # Nuke logic: edges come from the stack evaluation of the .nk file.
     for edge in nk_graph.edges:
         graph.add_edge(Edge(edge.src, edge.dst, kind=edge.kind, align=edge.align))
 
-    _group_columns(list(graph.nodes.values()), tolerance_x=tolerance_x)
+    if infer_merge_inputs:
+        nk_nodes = {n.name: n for n in nk_graph.nodes}
+        _adjust_merge_inputs_with_spatial_guard(graph, nk_nodes, allow_new_mask=False)
+
+    return graph
+
+
+def nk_to_graph(
+    nk_path: str,
+    scale: float = 0.05,
+    tolerance_x: float = 2.5,
+    return_meta: bool = False,
+    infer_merge_inputs: bool = False,
+    use_cache: bool = True,
+):
+    """Top-level graph of the script; Group bodies are left out (see nk_to_graphs)."""
+    nk_graph = parse_nk_cached(nk_path, use_cache=use_cache)
+    graph = nk_graph_to_graph(nk_graph, scale=scale, tolerance_x=tolerance_x, infer_merge_inputs=infer_merge_inputs)
 
     if return_meta:
-        meta = {
-            "source_nk": nk_path,
-            "root_name": nk_graph.root_name,
-            "scale": scale,
-            "tolerance_x": tolerance_x,
-            "centered_positions": True,
-            "used_stack": True,
-        }
-        return graph, meta
+        return graph, _scope_meta(nk_path, nk_graph.root_name, scale, tolerance_x)
     return graph
 
 
-def main() -> None:
-    if len(sys.argv) < 3:
-        print("Usage: python nk_to_graph.py <input.nk> <output.json> [scale] [tolerance_x]")
-        raise SystemExit(1)
+def _scope_meta(nk_path: str, root_name: Optional[str], scale: float, tolerance_x: float) -> Dict[str, Any]:
+    return {
+        "source_nk": nk_path,
+        "root_name": root_name,
+        "scale": scale,
+        "tolerance_x": tolerance_x,
+        "centered_positions": True,
+        "used_stack": True,
+    }
 
-    nk_path = sys.argv[1]
-    out_path = sys.argv[2]
-    scale = float(sys.argv[3]) if len(sys.argv) > 3 else 0.05
-    tolerance_x = float(sys.argv[4]) if len(sys.argv) > 4 else 2.5
 
-    graph, meta = nk_to_graph(nk_path, scale=scale, tolerance_x=tolerance_x, return_meta=True)
-    save_graph_json(graph, out_path, meta=meta)
+def _convert_scope(
+    nk_graph: NkGraph,
+    scale: float,
+    tolerance_x: float,
+    min_gap: Optional[float],
+    infer_merge_inputs: bool = False,
+) -> Graph:
+    graph = nk_graph_to_graph(nk_graph, scale=scale, tolerance_x=tolerance_x, infer_merge_inputs=infer_merge_inputs)
+    if min_gap is not None:
+        layout(graph, min_gap=min_gap)
+    return graph
+
+
+def nk_to_graphs(
+    nk_path: str,
+    scale: float = 0.05,
+    tolerance_x: float = 2.5,
+    min_gap: Optional[float] = None,
+    workers: int = 1,
+    use_cache: bool = True,
+    return_meta: bool = False,
+    infer_merge_inputs: bool = False,
+    include_groups: bool = True,
+):
+    """
+    One graph per scope, keyed by scope path ("root", "root/Group1", "root/Group1/Inner").
+    Scopes are independent, so with min_gap set each one is also laid out, and with
+    workers > 1 they are converted/laid out in a process pool.
+    With return_meta, also returns the per-scope meta dicts under the same keys.
+    infer_merge_inputs applies to the top-level scope only, as in nk_to_graph.
+    include_groups=False converts (and lays out) only the "root" scope.
+    """
+    nk_graph = parse_nk_cached(nk_path, use_cache=use_cache)
+    # Each scope is shipped without its nested groups: those are separate jobs.
+    if include_groups:
+        scopes = [(path, replace(scope, groups=[])) for path, scope in nk_graph.walk()]
+    else:
+        scopes = [("root", replace(nk_graph, groups=[]))]
+
+    jobs = [
+        (path, (scope, scale, tolerance_x, min_gap, infer_merge_inputs and path == "root"))
+        for path, scope in scopes
+    ]
+    if workers <= 1 or len(scopes) < 2:
+        graphs = {path: _convert_scope(*job) for path, job in jobs}
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {path: pool.submit(_convert_scope, *job) for path, job in jobs}
+            graphs = {path: fut.result() for path, fut in futures.items()}
+
+    if not return_meta:
+        return graphs
+    metas: Dict[str, Dict[str, Any]] = {}
+    for path, _scope in scopes:
+        # Only the top level carries the script's Root name.
+        root_name = nk_graph.root_name if path == "root" else None
+        metas[path] = _scope_meta(nk_path, root_name, scale, tolerance_x)
+        metas[path]["scope"] = path
+    return graphs, metas
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Convert a .nk file to layout graph JSON.")
+    ap.add_argument("nk_path")
+    ap.add_argument("out_path", help="Graph file; a .lgag extension writes the binary format")
+    ap.add_argument("scale", nargs="?", type=float, default=0.05)
+    ap.add_argument("tolerance_x", nargs="?", type=float, default=2.5)
+    ap.add_argument(
+        "--groups",
+        action="store_true",
+        help="Also write one JSON per Group body (<out>.<Group>.json)",
+    )
+    ap.add_argument("--layout", type=float, default=None, metavar="MIN_GAP", help="Lay out each scope before writing")
+    ap.add_argument("--workers", type=int, default=1, help="Processes used for Group bodies")
+    ap.add_argument(
+        "--infer-merge-inputs",
+        action="store_true",
+        help="Replace Merge inputs that are not spatially plausible (top level only)",
+    )
+    ap.add_argument("--no-cache", action="store_true", help="Always reparse the .nk (skip the parsed-graph cache)")
+    args = ap.parse_args()
+    use_cache = not args.no_cache
+
+    if not args.groups and args.layout is None:
+        graph, meta = nk_to_graph(
+            args.nk_path,
+            scale=args.scale,
+            tolerance_x=args.tolerance_x,
+            return_meta=True,
+            infer_merge_inputs=args.infer_merge_inputs,
+            use_cache=use_cache,
+        )
+        save_graph(graph, args.out_path, meta=meta)
+        return
+
+    graphs, metas = nk_to_graphs(
+        args.nk_path,
+        scale=args.scale,
+        tolerance_x=args.tolerance_x,
+        min_gap=args.layout,
+        workers=args.workers,
+        use_cache=use_cache,
+        return_meta=True,
+        infer_merge_inputs=args.infer_merge_inputs,
+        include_groups=args.groups,
+    )
+    out = Path(args.out_path)
+    for scope_path, graph in graphs.items():
+        meta = metas[scope_path]
+        if scope_path == "root":
+            target = out
+        else:
+            suffix = scope_path.split("/", 1)[1].replace("/", ".")
+            target = out.with_name(f"{out.stem}.{suffix}{out.suffix}")
+        save_graph(graph, str(target), meta=meta)
+        print(f"Wrote: {target}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,175 @@
+"""
+Headless arrange benchmark: synthetic comps -> layout_core.layout(), timings appended to a JSON history.
+Usage: python bench_cli.py [--sizes 50,200,1000,5000,20000] [--history out/bench_history.json]
+"""
+
+from pathlib import Path
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from graph_io import graph_to_dict
+from graph_synthetic import SyntheticSpec, synthetic_comp, synthetic_suite
+from layout_core import LayoutProfiler, layout
+from LGA_check_JSON_arrange import check_alignment, check_overlaps
+
+DEFAULT_SIZES = [50, 200, 1000, 5000, 20000]
+DEFAULT_HISTORY = Path(__file__).resolve().parent / "out" / "bench_history.json"
+# A case is flagged when its layout time grows past this ratio vs the previous run.
+REGRESSION_RATIO = 1.25
+
+
+def run_case(spec: SyntheticSpec, min_gap: float, check: bool, memory: bool) -> Dict[str, Any]:
+    phases: Dict[str, float] = {}
+
+    t0 = time.perf_counter()
+    graph = synthetic_comp(spec)
+    phases["generate"] = time.perf_counter() - t0
+    n_nodes = len(graph.nodes)
+    n_edges = len(graph.edges)
+
+    # Per-pass breakdown of the layout phase (span totals across iterations).
+    profiler = LayoutProfiler()
+    t0 = time.perf_counter()
+    layout(graph, min_gap=min_gap, profiler=profiler)
+    phases["layout"] = time.perf_counter() - t0
+    passes = {name: round(entry["total_s"], 6) for name, entry in profiler.summary().items()}
+
+    checks: Optional[Dict[str, int]] = None
+    if check:
+        t0 = time.perf_counter()
+        data = graph_to_dict(graph)
+        nodes = {n["name"]: n for n in data["nodes"]}
+        checks = {
+            "align_errors": len(check_alignment(nodes, data["edges"], tol=1e-3)),
+            "overlap_errors": len(check_overlaps(nodes, tol=1e-6)),
+        }
+        phases["check"] = time.perf_counter() - t0
+
+    peak_kb = None
+    if memory:
+        # Separate pass: tracemalloc slows allocation-heavy code, so it never wraps the timed run.
+        tracemalloc.start()
+        try:
+            layout(synthetic_comp(spec), min_gap=min_gap)
+            _current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        peak_kb = round(peak / 1024.0, 1)
+
+    return {
+        "case": spec.label(),
+        "params": spec.to_dict(),
+        "nodes": n_nodes,
+        "edges": n_edges,
+        "wall_s": round(phases["layout"], 6),
+        "iterations": graph.iterations_used,
+        "peak_kb": peak_kb,
+        "phases": {k: round(v, 6) for k, v in phases.items()},
+        "passes": passes,
+        "counters": dict(profiler.counters),
+        "checks": checks,
+    }
+
+
+def load_history(path: Path) -> List[Dict[str, Any]]:
+    if not path.exists():
+        return []
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def previous_results(history: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Latest recorded result per case label."""
+    latest: Dict[str, Dict[str, Any]] = {}
+    for run in history:
+        for res in run.get("results", []):
+            latest[res["case"]] = res
+    return latest
+
+
+def compare(result: Dict[str, Any], prev: Optional[Dict[str, Any]]) -> str:
+    if not prev or not prev.get("wall_s"):
+        return "new"
+    ratio = result["wall_s"] / prev["wall_s"]
+    tag = "REGRESSION" if ratio > REGRESSION_RATIO else "ok"
+    return f"{tag} x{ratio:.2f}"
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark layout_core.layout() on synthetic comps.")
+    ap.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES), help="Comma separated node counts")
+    ap.add_argument("--columns", type=int, default=4)
+    ap.add_argument("--depth", type=int, default=4, help="Nodes per side branch")
+    ap.add_argument("--fan-in", type=int, default=2, help="Branches merged per principal Merge")
+    ap.add_argument("--mask-density", type=float, default=0.1)
+    ap.add_argument("--dot-chain", type=int, default=1)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--min-gap", type=float, default=0.2)
+    ap.add_argument("--history", default=str(DEFAULT_HISTORY), help="JSON history file (appended)")
+    ap.add_argument("--no-check", action="store_true", help="Skip align/overlap checks")
+    ap.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc peak-memory pass")
+    ap.add_argument("--no-save", action="store_true", help="Do not append this run to the history")
+    ap.add_argument("--fail-on-regression", action="store_true")
+    args = ap.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    specs = synthetic_suite(
+        sizes,
+        columns=args.columns,
+        depth=args.depth,
+        merge_fan_in=args.fan_in,
+        mask_density=args.mask_density,
+        dot_chain=args.dot_chain,
+        seed=args.seed,
+    )
+
+    history_path = Path(args.history)
+    history = load_history(history_path)
+    prev = previous_results(history)
+
+    results: List[Dict[str, Any]] = []
+    regressions = 0
+    for spec in specs:
+        res = run_case(spec, min_gap=args.min_gap, check=not args.no_check, memory=not args.no_memory)
+        results.append(res)
+        status = compare(res, prev.get(res["case"]))
+        if status.startswith("REGRESSION"):
+            regressions += 1
+        mem = f"{res['peak_kb']:.0f}KB" if res["peak_kb"] is not None else "-"
+        checks = res["checks"]
+        check_txt = f"align={checks['align_errors']} overlap={checks['overlap_errors']}" if checks else "-"
+        print(
+            f"{res['case']}: nodes={res['nodes']} edges={res['edges']} "
+            f"layout={res['wall_s']:.3f}s iters={res['iterations']} peak={mem} {check_txt} [{status}]"
+        )
+        # "iteration" wraps the other passes; rank the passes themselves.
+        passes = [kv for kv in res["passes"].items() if kv[0] != "iteration"]
+        slowest = sorted(passes, key=lambda kv: kv[1], reverse=True)[:3]
+        print("  " + " ".join(f"{name}={secs:.3f}s" for name, secs in slowest))
+
+    if not args.no_save:
+        history.append(
+            {
+                "run_at": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "results": results,
+            }
+        )
+        history_path.parent.mkdir(parents=True, exist_ok=True)
+        history_path.write_text(json.dumps(history, indent=2), encoding="utf-8")
+        print(f"Wrote: {history_path}")
+
+    if regressions and args.fail_on_regression:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,24 @@
 """
 Graph JSON IO helpers for layout_core.Graph.
+Also a compact binary format (.lgag) for large graphs; load_graph() accepts either.
 """
 
+from array import array
 from dataclasses import asdict
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 import json
+import struct
+import sys
 
 from layout_core import Graph, Node, Edge
 
+BINARY_MAGIC = b"LGAG"
+BINARY_VERSION = 1
+# magic, version, node count, edge count, string table bytes, meta bytes (little endian).
+_HEADER = struct.Struct("<4sHIIII")
+BINARY_SUFFIX = ".lgag"
+
 
 def graph_to_dict(graph: Graph, meta: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     data: Dict[str, Any] = {"nodes": [], "edges": [], "meta": meta or {}}
@@ -62,3 +72,143 @@ def save_graph_json(graph: Graph, path: str, meta: Optional[Dict[str, Any]] = No
 def load_graph_json(path: str) -> Graph:
     data = json.loads(Path(path).read_text(encoding="utf-8"))
     return graph_from_dict(data)
+
+
+# -------------------------
+# Binary format
+# -------------------------
+# Layout after the header: string table (utf-8, NUL separated), meta JSON, then
+# u32 name/klass/column string ids + i32 order + f64 x/y/height per node,
+# u32 src/dst/kind string ids + u8 align per edge. Columns are stored whole.
+
+
+def _le(arr: array) -> bytes:
+    if sys.byteorder == "big":
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def _read_array(typecode: str, buf: memoryview, offset: int, count: int) -> Tuple[array, int]:
+    arr = array(typecode)
+    end = offset + arr.itemsize * count
+    arr.frombytes(buf[offset:end])
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return arr, end
+
+
+def graph_to_bytes(graph: Graph, meta: Optional[Dict[str, Any]] = None) -> bytes:
+    strings: List[str] = []
+    index: Dict[str, int] = {}
+
+    def sid(text: str) -> int:
+        i = index.get(text)
+        if i is None:
+            i = index[text] = len(strings)
+            strings.append(text)
+        return i
+
+    nodes = list(graph.nodes.values())
+    name_ids = array("I", (sid(n.name) for n in nodes))
+    klass_ids = array("I", (sid(n.klass) for n in nodes))
+    column_ids = array("I", (sid(n.column) for n in nodes))
+    orders = array("i", (n.order for n in nodes))
+    xs = array("d", (n.x for n in nodes))
+    ys = array("d", (n.y for n in nodes))
+    heights = array("d", (n.height for n in nodes))
+
+    src_ids = array("I", (sid(e.src) for e in graph.edges))
+    dst_ids = array("I", (sid(e.dst) for e in graph.edges))
+    kind_ids = array("I", (sid(e.kind) for e in graph.edges))
+    aligns = bytes(1 if e.align else 0 for e in graph.edges)
+
+    table = "\0".join(strings).encode("utf-8")
+    meta_blob = json.dumps(meta or {}).encode("utf-8")
+    header = _HEADER.pack(BINARY_MAGIC, BINARY_VERSION, len(nodes), len(graph.edges), len(table), len(meta_blob))
+    return b"".join(
+        [header, table, meta_blob]
+        + [_le(a) for a in (name_ids, klass_ids, column_ids, orders, xs, ys, heights, src_ids, dst_ids, kind_ids)]
+        + [aligns]
+    )
+
+
+def graph_from_bytes(data: bytes) -> Tuple[Graph, Dict[str, Any]]:
+    magic, version, n_nodes, n_edges, table_len, meta_len = _HEADER.unpack_from(data, 0)
+    if magic != BINARY_MAGIC:
+        raise ValueError("Not a binary graph file")
+    if version != BINARY_VERSION:
+        raise ValueError(f"Unsupported binary graph version: {version}")
+    buf = memoryview(data)
+    offset = _HEADER.size
+    table = bytes(buf[offset:offset + table_len]).decode("utf-8")
+    strings = table.split("\0") if table_len else [""]
+    offset += table_len
+    meta = json.loads(bytes(buf[offset:offset + meta_len]).decode("utf-8"))
+    offset += meta_len
+
+    name_ids, offset = _read_array("I", buf, offset, n_nodes)
+    klass_ids, offset = _read_array("I", buf, offset, n_nodes)
+    column_ids, offset = _read_array("I", buf, offset, n_nodes)
+    orders, offset = _read_array("i", buf, offset, n_nodes)
+    xs, offset = _read_array("d", buf, offset, n_nodes)
+    ys, offset = _read_array("d", buf, offset, n_nodes)
+    heights, offset = _read_array("d", buf, offset, n_nodes)
+    src_ids, offset = _read_array("I", buf, offset, n_edges)
+    dst_ids, offset = _read_array("I", buf, offset, n_edges)
+    kind_ids, offset = _read_array("I", buf, offset, n_edges)
+    aligns = bytes(buf[offset:offset + n_edges])
+
+    graph = Graph()
+    for name, klass, column, order, x, y, height in zip(name_ids, klass_ids, column_ids, orders, xs, ys, heights):
+        graph.add_node(
+            Node(
+                name=strings[name],
+                klass=strings[klass],
+                column=strings[column],
+                order=order,
+                x=x,
+                y=y,
+                height=height,
+            )
+        )
+    for src, dst, kind, align in zip(src_ids, dst_ids, kind_ids, aligns):
+        graph.add_edge(Edge(src=strings[src], dst=strings[dst], kind=strings[kind], align=bool(align)))
+    return graph, meta
+
+
+def save_graph_binary(graph: Graph, path: str, meta: Optional[Dict[str, Any]] = None) -> None:
+    Path(path).write_bytes(graph_to_bytes(graph, meta=meta))
+
+
+def load_graph_binary(path: str) -> Graph:
+    graph, _meta = graph_from_bytes(Path(path).read_bytes())
+    return graph
+
+
+def is_binary_graph(path: str) -> bool:
+    with open(path, "rb") as fh:
+        return fh.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+
+
+def load_graph(path: str) -> Graph:
+    """Load a graph file in either format, detected by content (not extension)."""
+    if is_binary_graph(path):
+        return load_graph_binary(path)
+    return load_graph_json(path)
+
+
+def load_graph_data(path: str) -> Dict[str, Any]:
+    """Graph file in either format as the JSON dict layout (nodes/edges/meta)."""
+    if is_binary_graph(path):
+        graph, meta = graph_from_bytes(Path(path).read_bytes())
+        return graph_to_dict(graph, meta=meta)
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def save_graph(graph: Graph, path: str, meta: Optional[Dict[str, Any]] = None) -> None:
+    """Save by extension: .lgag is binary, anything else JSON."""
+    if Path(path).suffix == BINARY_SUFFIX:
+        save_graph_binary(graph, path, meta=meta)
+    else:
+        save_graph_json(graph, path, meta=meta)
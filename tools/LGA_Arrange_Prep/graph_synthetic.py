@@ -0,0 +1,133 @@
+"""
+Synthetic comp generators for layout benchmarks.
+Builds Nuke-like graphs (principal trunk + side branches) of any size, in layout_core units.
+"""
+
+from dataclasses import dataclass, asdict
+from typing import Dict, List
+import random
+
+from layout_core import Graph, Node, Edge
+
+# Same units as LGA_nk_to_json (scale 0.05): heights ~0.5, columns ~6 apart.
+COLUMN_SPACING = 6.0
+ROW_STEP = 0.9
+X_JITTER = 0.4
+Y_JITTER = 0.1
+CLASS_HEIGHTS = {
+    "Merge2": 0.8,
+    "Blur": 0.6,
+    "Roto": 0.6,
+    "Dot": 0.2,
+}
+
+
+@dataclass
+class SyntheticSpec:
+    nodes: int = 200            # target node count (the result can overshoot by one merge block)
+    columns: int = 4            # principal column + side columns
+    depth: int = 4              # nodes per side branch (before its Dot chain)
+    merge_fan_in: int = 2       # side branches merged into each principal Merge
+    mask_density: float = 0.1   # probability of a Roto mask feeding a principal Grade
+    dot_chain: int = 1          # Dots between a branch and its Merge
+    trunk_between_merges: int = 3
+    seed: int = 0
+
+    def label(self) -> str:
+        return (
+            f"n{self.nodes}_c{self.columns}_d{self.depth}_f{self.merge_fan_in}"
+            f"_m{self.mask_density:g}_dot{self.dot_chain}_s{self.seed}"
+        )
+
+    def to_dict(self) -> Dict[str, object]:
+        return asdict(self)
+
+
+class _Builder:
+    def __init__(self, spec: SyntheticSpec) -> None:
+        self.spec = spec
+        self.rng = random.Random(spec.seed)
+        self.graph = Graph(auto_columns=True, tolerance_x=2.5)
+        self.counters: Dict[str, int] = {}
+        self.orders: Dict[str, int] = {}
+        # Lowest free Y per side column (branches are stacked top to bottom).
+        side = max(1, spec.columns - 1)
+        self.cursor: List[float] = [0.0] * side
+        self.next_side = 0
+
+    def add(self, klass: str, col_idx: int, y: float) -> str:
+        self.counters[klass] = self.counters.get(klass, 0) + 1
+        name = f"{klass}{self.counters[klass]}"
+        column = f"C{col_idx}"
+        order = self.orders.get(column, 0)
+        self.orders[column] = order + 1
+        x = col_idx * COLUMN_SPACING + self.rng.uniform(-X_JITTER, X_JITTER)
+        y = y + self.rng.uniform(-Y_JITTER, Y_JITTER)
+        height = CLASS_HEIGHTS.get(klass, 0.5)
+        self.graph.add_node(Node(name=name, column=column, order=order, klass=klass, x=x, y=y, height=height))
+        return name
+
+    def connect(self, src: str, dst: str, kind: str = "flow") -> None:
+        self.graph.add_edge(Edge(src, dst, kind=kind, align=kind != "flow"))
+
+    def take_side(self) -> int:
+        idx = self.next_side % len(self.cursor)
+        self.next_side += 1
+        return idx
+
+    def branch(self, target_y: float) -> str:
+        """Stack a side branch ending at target_y; returns the last node (Dot or branch tail)."""
+        side = self.take_side()
+        col_idx = side + 1
+        length = max(1, self.spec.depth) + max(0, self.spec.dot_chain)
+        top = min(target_y + (length - 1) * ROW_STEP, self.cursor[side] - ROW_STEP)
+        y = top
+        prev = self.add("Read", col_idx, y)
+        for i in range(1, max(1, self.spec.depth)):
+            y -= ROW_STEP
+            cur = self.add("Blur" if i % 2 else "Grade", col_idx, y)
+            self.connect(prev, cur)
+            prev = cur
+        for _ in range(max(0, self.spec.dot_chain)):
+            y -= ROW_STEP
+            cur = self.add("Dot", col_idx, y)
+            self.connect(prev, cur)
+            prev = cur
+        self.cursor[side] = y - ROW_STEP
+        return prev
+
+    def mask(self, target: str, target_y: float) -> None:
+        side = self.take_side()
+        y = min(target_y, self.cursor[side] - ROW_STEP)
+        roto = self.add("Roto", side + 1, y)
+        self.cursor[side] = y - ROW_STEP
+        self.connect(roto, target, kind="mask")
+
+
+def synthetic_comp(spec: SyntheticSpec) -> Graph:
+    """Principal trunk of Grades with periodic Merges fed by side branches and Roto masks."""
+    b = _Builder(spec)
+    y = 0.0
+    prev = b.add("Read", 0, y)
+    while len(b.graph.nodes) < spec.nodes:
+        for _ in range(max(1, spec.trunk_between_merges)):
+            y -= ROW_STEP
+            cur = b.add("Grade", 0, y)
+            b.connect(prev, cur)
+            prev = cur
+            if spec.columns > 1 and b.rng.random() < spec.mask_density:
+                b.mask(cur, y)
+        if spec.columns <= 1:
+            continue
+        y -= ROW_STEP
+        merge = b.add("Merge2", 0, y)
+        b.connect(prev, merge, kind="B")
+        for _ in range(max(1, spec.merge_fan_in)):
+            tail = b.branch(y)
+            b.connect(tail, merge, kind="A")
+        prev = merge
+    return b.graph
+
+
+def synthetic_suite(sizes: List[int], **overrides) -> List[SyntheticSpec]:
+    return [SyntheticSpec(nodes=size, **overrides) for size in sizes]
@@ -1,30 +1,29 @@
 """
-Convert graph JSON to Graphviz DOT.
+Convert graph JSON (or binary .lgag) to Graphviz DOT.
 """
 
 from pathlib import Path
+import argparse
 import sys
 
 sys.path.append(str(Path(__file__).resolve().parent))
 
-from graph_io import load_graph_json
+from graph_io import load_graph
 import re
-from graphviz_export import to_dot
+from graphviz_export import add_dot_arguments, dot_options, save_dot
 
 
 def main() -> None:
-    if len(sys.argv) < 3:
-        print("Usage: python graph_to_dot.py <input.json> <output.dot>")
-        raise SystemExit(1)
-
-    in_path = sys.argv[1]
-    out_path = sys.argv[2]
-
-    graph = load_graph_json(in_path)
-    raw_title = Path(in_path).stem
+    ap = argparse.ArgumentParser(description="Graph JSON (or .lgag) -> Graphviz DOT.")
+    ap.add_argument("input", help="Graph .json or .lgag")
+    ap.add_argument("output", help="Output .dot")
+    add_dot_arguments(ap)
+    args = ap.parse_args()
+
+    graph = load_graph(args.input)
+    raw_title = Path(args.input).stem
     safe_title = re.sub(r"[^A-Za-z0-9_]", "_", raw_title) or "Graph"
-    dot = to_dot(graph, title=safe_title)
-    Path(out_path).write_text(dot, encoding="utf-8")
+    save_dot(graph, args.output, title=safe_title, **dot_options(args))
 
 
 if __name__ == "__main__":
@@ -1,9 +1,12 @@
 """
 Graphviz DOT export helpers.
+write_dot/save_dot stream line by line; to_dot returns the same text as one string.
 """
 
-from typing import List
-from layout_core import Graph, Node
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, TextIO, Tuple
+import argparse
+
+from layout_core import Edge, Graph, Node
 
 
 def _node_style(node: Node) -> str:
@@ -38,13 +41,8 @@ def _node_style(node: Node) -> str:
     return 'shape=box, style="rounded,filled", fillcolor="#dddddd"'
 
 
-def to_dot(graph: Graph, title: str = "G") -> str:
-    lines: List[str] = []
-    lines.append(f'digraph {title} {{')
-    lines.append('  graph [layout=neato, splines=ortho, overlap=false];')
-    lines.append('  node [fontname="Helvetica", fontsize=10, fixedsize=true, width=1.6, height=0.5];')
-
-    for node in graph.nodes.values():
+def _node_lines(nodes: Iterable[Node]) -> Iterator[str]:
+    for node in nodes:
         style = _node_style(node)
         attrs = [style, f'pos="{node.x},{node.y}!"']
         # Only set per-node height for non-dot nodes
@@ -54,13 +52,116 @@ def to_dot(graph: Graph, title: str = "G") -> str:
         else:
             attrs.append(f'height="{node.height}"')
             attrs.append('width="1.6"')
-        lines.append(f'  {node.name} [{", ".join(attrs)} ];')
+        yield f'  {node.name} [{", ".join(attrs)} ];'
 
-    for edge in graph.edges:
+
+def _edge_lines(edges: Iterable[Edge]) -> Iterator[str]:
+    for edge in edges:
         if edge.kind == "mask":
-            lines.append(f'  {edge.src} -> {edge.dst} [label="mask", fontsize=9];')
+            yield f'  {edge.src} -> {edge.dst} [label="mask", fontsize=9];'
         else:
-            lines.append(f'  {edge.src} -> {edge.dst};')
+            yield f'  {edge.src} -> {edge.dst};'
+
+
+def neighbourhood(graph: Graph, focus: Iterable[str], radius: int) -> Set[str]:
+    """Names within `radius` edges (either direction) of any focus node."""
+    seen = {name for name in focus if name in graph.nodes}
+    frontier = list(seen)
+    for _ in range(radius):
+        nxt: List[str] = []
+        for name in frontier:
+            for edge in graph.edges_of(name):
+                other = edge.dst if edge.src == name else edge.src
+                if other not in seen and other in graph.nodes:
+                    seen.add(other)
+                    nxt.append(other)
+        if not nxt:
+            break
+        frontier = nxt
+    return seen
+
+
+def _collapsed_lines(graph: Graph, keep: Optional[Set[str]] = None) -> Iterator[str]:
+    # One box per column at its mean position; edges between columns are merged with a count.
+    # With keep, only those nodes (and the edges among them) are counted.
+    columns = graph.columns()
+    for col, col_nodes in columns.items():
+        if keep is not None:
+            col_nodes = [n for n in col_nodes if n.name in keep]
+            if not col_nodes:
+                continue
+        cx = sum(n.x for n in col_nodes) / len(col_nodes)
+        cy = sum(n.y for n in col_nodes) / len(col_nodes)
+        yield f'  col_{col} [shape=box, style="rounded,filled", fillcolor="#dddddd", label="{col}\\n{len(col_nodes)} nodes", pos="{cx},{cy}!" ];'
+    counts: Dict[Tuple[str, str], int] = {}
+    for edge in graph.edges:
+        src = graph.nodes.get(edge.src)
+        dst = graph.nodes.get(edge.dst)
+        if src is None or dst is None or src.column == dst.column:
+            continue
+        if keep is not None and (edge.src not in keep or edge.dst not in keep):
+            continue
+        key = (src.column, dst.column)
+        counts[key] = counts.get(key, 0) + 1
+    for (src_col, dst_col), count in counts.items():
+        yield f'  col_{src_col} -> col_{dst_col} [label="{count}", fontsize=9];'
+
+
+def iter_dot_lines(
+    graph: Graph,
+    title: str = "G",
+    focus: Optional[Iterable[str]] = None,
+    radius: int = 2,
+    collapse_columns: bool = False,
+) -> Iterator[str]:
+    """
+    DOT lines for graph, one at a time.
+    focus: only emit nodes within `radius` edges of these names (and the edges among them).
+    collapse_columns: one node per column, with inter-column edge counts; combined with
+    focus, only the columns and edges of the focus neighbourhood are collapsed.
+    """
+    yield f'digraph {title} {{'
+    yield '  graph [layout=neato, splines=ortho, overlap=false];'
+    yield '  node [fontname="Helvetica", fontsize=10, fixedsize=true, width=1.6, height=0.5];'
+
+    keep = neighbourhood(graph, focus, radius) if focus is not None else None
+    if collapse_columns:
+        yield from _collapsed_lines(graph, keep)
+    elif keep is not None:
+        yield from _node_lines(n for n in graph.nodes.values() if n.name in keep)
+        yield from _edge_lines(e for e in graph.edges if e.src in keep and e.dst in keep)
+    else:
+        yield from _node_lines(graph.nodes.values())
+        yield from _edge_lines(graph.edges)
+
+    yield '}'
+
+
+def write_dot(graph: Graph, fh: TextIO, title: str = "G", **options: Any) -> None:
+    """Stream DOT to an open text handle (same text as to_dot, without building it in memory)."""
+    first = True
+    for line in iter_dot_lines(graph, title=title, **options):
+        if not first:
+            fh.write("\n")
+        fh.write(line)
+        first = False
+
+
+def save_dot(graph: Graph, path: str, title: str = "G", **options: Any) -> None:
+    with open(path, "w", encoding="utf-8") as fh:
+        write_dot(graph, fh, title=title, **options)
+
+
+def to_dot(graph: Graph, title: str = "G", **options: Any) -> str:
+    return "\n".join(iter_dot_lines(graph, title=title, **options))
+
+
+def add_dot_arguments(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument("--focus", default=None, help="Comma separated node names: export only their neighbourhood")
+    ap.add_argument("--radius", type=int, default=2, help="Edges around --focus nodes to include")
+    ap.add_argument("--collapse-columns", action="store_true", help="One node per column, inter-column edge counts")
+
 
-    lines.append('}')
-    return "\n".join(lines)
+def dot_options(args: argparse.Namespace) -> Dict[str, Any]:
+    focus = [name.strip() for name in args.focus.split(",") if name.strip()] if args.focus else None
+    return {"focus": focus, "radius": args.radius, "collapse_columns": args.collapse_columns}
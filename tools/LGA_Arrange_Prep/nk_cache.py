@@ -0,0 +1,127 @@
+"""
+On-disk cache of parsed .nk graphs for the prep tools.
+Key: content hash of the .nk + parser version + knob whitelist. Entries are zlib-compressed
+pickles of the NkGraph tree; the least recently used ones are evicted past a size budget.
+"""
+
+from pathlib import Path
+from typing import Iterable, Optional
+import hashlib
+import os
+import pickle
+import zlib
+
+from nk_parser import DAG_KNOBS, PARSER_VERSION, NkGraph, parse_nk
+
+# LGA_NK_CACHE_DIR overrides the location; LGA_NK_CACHE=0 disables the cache.
+DEFAULT_CACHE_DIR = Path(os.environ.get("LGA_NK_CACHE_DIR", Path.home() / ".cache" / "LGA_Arrange_Prep" / "nk"))
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+_HASH_CHUNK = 1024 * 1024
+_SUFFIX = ".nkgraph"
+
+
+def cache_enabled() -> bool:
+    return os.environ.get("LGA_NK_CACHE", "1") != "0"
+
+
+def file_digest(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(_HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cache_key(path: str, knobs: Optional[Iterable[str]] = DAG_KNOBS) -> str:
+    h = hashlib.sha256()
+    h.update(file_digest(path).encode("ascii"))
+    h.update(f"|v{PARSER_VERSION}|".encode("ascii"))
+    h.update(("*" if knobs is None else ",".join(sorted(set(knobs)))).encode("utf-8"))
+    return h.hexdigest()
+
+
+class NkCache:
+    """Size-bounded LRU store of parsed graphs (recency = file mtime, refreshed on every hit)."""
+
+    def __init__(self, cache_dir: Optional[Path] = None, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def _entry(self, key: str) -> Path:
+        return self.cache_dir / f"{key}{_SUFFIX}"
+
+    def get(self, key: str) -> Optional[NkGraph]:
+        entry = self._entry(key)
+        try:
+            graph = pickle.loads(zlib.decompress(entry.read_bytes()))
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # Truncated or stale entry: drop it and reparse.
+            entry.unlink(missing_ok=True)
+            return None
+        os.utime(entry)
+        return graph
+
+    def put(self, key: str, graph: NkGraph) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        entry = self._entry(key)
+        tmp = entry.with_name(f"{entry.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(zlib.compress(pickle.dumps(graph, protocol=pickle.HIGHEST_PROTOCOL), 1))
+        # Atomic publish, so parallel prep runs never read a half-written entry.
+        os.replace(tmp, entry)
+        self.evict()
+
+    def evict(self) -> int:
+        """Remove least recently used entries until the cache fits max_bytes; returns how many."""
+        entries = []
+        total = 0
+        for entry in self.cache_dir.glob(f"*{_SUFFIX}"):
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, entry))
+            total += st.st_size
+        removed = 0
+        for _mtime, size, entry in sorted(entries, key=lambda t: t[0]):
+            if total <= self.max_bytes:
+                break
+            entry.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        return removed
+
+    def parse(self, path: str, knobs: Optional[Iterable[str]] = DAG_KNOBS) -> NkGraph:
+        key = cache_key(path, knobs)
+        graph = self.get(key)
+        if graph is None:
+            self.misses += 1
+            graph = parse_nk(path, knobs=knobs)
+            try:
+                self.put(key, graph)
+            except OSError:
+                pass  # Read-only or full cache dir: the parse result is still good.
+            return graph
+        self.hits += 1
+        # Same content under another path: lazy knob reads must hit the file given now.
+        for _scope, scope_graph in graph.walk():
+            for node in scope_graph.nodes:
+                if node.source is not None:
+                    node.source = path
+        return graph
+
+
+_default_cache: Optional[NkCache] = None
+
+
+def parse_nk_cached(path: str, knobs: Optional[Iterable[str]] = DAG_KNOBS, use_cache: bool = True) -> NkGraph:
+    """parse_nk through the shared on-disk cache (falls back to a plain parse when disabled)."""
+    global _default_cache
+    if not use_cache or not cache_enabled():
+        return parse_nk(path, knobs=knobs)
+    if _default_cache is None:
+        _default_cache = NkCache()
+    return _default_cache.parse(path, knobs=knobs)
@@ -1,11 +1,12 @@
 """
 Minimal .nk parser for extracting nodes, positions, and connections.
 Focus: DAG info only (name, class, xpos/ypos, inputs).
+Streams the file line by line, so memory stays flat on large comps with heavy Roto/curve knobs.
+Only whitelisted knobs are decoded; the rest keep a byte span and are read back on demand.
 """
 
 from dataclasses import dataclass, field
-from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 import re
 
 
@@ -18,6 +19,18 @@ class NkNode:
     inputs_spec: Optional[str] = None
     label: str = ""
     knobs: Dict[str, str] = field(default_factory=dict)
+    # Byte spans (start, end) in `source` of the knobs that were not materialised.
+    knob_offsets: Dict[str, Tuple[int, int]] = field(default_factory=dict)
+    source: Optional[str] = None
+
+    def knob(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        """Knob value as written in the .nk, read from disk if it was parsed lazily."""
+        if key in self.knobs:
+            return self.knobs[key]
+        span = self.knob_offsets.get(key)
+        if span is None or self.source is None:
+            return default
+        return read_knob_span(self.source, span)
 
 
 @dataclass
@@ -36,11 +49,35 @@ class NkGraph:
     root_name: Optional[str] = None
     has_stack: bool = False
     explicit_stack_ops: bool = False
+    # Group/Gizmo node whose body this graph is (None for the script's top level).
+    owner: Optional[str] = None
+    groups: List["NkGraph"] = field(default_factory=list)
+
+    def walk(self, prefix: str = "") -> Iterator[Tuple[str, "NkGraph"]]:
+        """Yield (scope path, graph) for this graph and every nested group, depth first."""
+        path = f"{prefix}/{self.owner}" if prefix else (self.owner or "root")
+        yield path, self
+        for group in self.groups:
+            yield from group.walk(path)
+
+
+# Bump whenever parse output changes: it invalidates the prep tools' parsed-graph cache.
+PARSER_VERSION = 3
 
+# Patterns run on raw bytes so skipped lines are never decoded.
+_NODE_START_RE = re.compile(rb"^([A-Za-z0-9_.]+)\s*\{\s*$")
+_SET_STACK_RE = re.compile(rb"^set\s+([A-Za-z0-9_]+)\s+\[stack\s+0\]")
+_PUSH_RE = re.compile(rb"^push\s+(.+)$")
 
-_NODE_START_RE = re.compile(r"^([A-Za-z0-9_.]+)\s*\{\s*$")
-_SET_STACK_RE = re.compile(r"^set\s+([A-Za-z0-9_]+)\s+\[stack\s+0\]")
-_PUSH_RE = re.compile(r"^push\s+(.+)$")
+# Node classes whose block is followed by their body, closed with `end_group`.
+GROUP_CLASSES = ("Group", "Gizmo")
+
+_KNOB_RE = re.compile(rb"^\s*([A-Za-z0-9_]+)[ \t]+(.*?)\s*$")
+
+# Knobs the parser itself needs; always materialised whatever the whitelist.
+_PARSE_KNOBS = frozenset(("name", "xpos", "ypos", "inputs", "label"))
+# Default whitelist: what nk_to_graph needs (position, inputs, label, Dot size).
+DAG_KNOBS = ("name", "xpos", "ypos", "inputs", "label", "size")
 
 
 DEFAULT_INPUTS: Dict[str, Tuple[int, int]] = {
@@ -101,148 +138,196 @@ def _estimate_label_lines(label: str) -> int:
     return max(1, label.count("\n") + 1)
 
 
-def parse_nk(path: str) -> NkGraph:
-    text = Path(path).read_text(encoding="utf-8", errors="ignore")
-    lines = text.splitlines()
+def _knob_text(raw: bytes) -> str:
+    return raw.decode("utf-8", errors="ignore").strip()
 
-    graph = NkGraph()
-    stack: List[Optional[str]] = []
-    variables: Dict[str, Optional[str]] = {}
-    explicit_push = False
-
-    i = 0
-    while i < len(lines):
-        line = lines[i].rstrip()
-        stripped = line.strip()
-
-        if not stripped:
-            i += 1
-            continue
 
-        m_set = _SET_STACK_RE.match(stripped)
-        if m_set:
-            var = m_set.group(1)
-            variables[var] = stack[-1] if stack else None
-            graph.has_stack = True
-            graph.explicit_stack_ops = True
-            i += 1
-            continue
+def read_knob_span(path: str, span: Tuple[int, int]) -> str:
+    start, end = span
+    with open(path, "rb") as fh:
+        fh.seek(start)
+        return _knob_text(fh.read(end - start))
 
-        m_push = _PUSH_RE.match(stripped)
-        if m_push:
-            token = m_push.group(1).strip()
-            if token.startswith("$"):
-                val = variables.get(token[1:], None)
-            elif token == "0":
-                val = None
-            else:
-                val = token
-            stack.append(val)
-            explicit_push = True
-            graph.has_stack = True
-            graph.explicit_stack_ops = True
-            i += 1
-            continue
 
-        if stripped == "pop":
-            if stack:
-                stack.pop()
-            graph.has_stack = True
-            graph.explicit_stack_ops = True
-            i += 1
+def _float_knob(val: Optional[str]) -> Optional[float]:
+    if val is None:
+        return None
+    try:
+        return float(val)
+    except ValueError:
+        return None
+
+
+def _close_node(
+    graph: NkGraph,
+    stack: List[Optional[str]],
+    klass: str,
+    knobs: Dict[str, str],
+    offsets: Dict[str, Tuple[int, int]],
+    source: str,
+) -> Optional[str]:
+    name = knobs.get("name")
+    xpos = _float_knob(knobs.get("xpos"))
+    ypos = _float_knob(knobs.get("ypos"))
+    inputs_spec = knobs.get("inputs")
+    label = knobs.get("label", "")
+    if label.startswith('"') and label.endswith('"'):
+        label = label[1:-1]
+
+    if klass == "Root":
+        if name:
+            graph.root_name = name
+        return None
+
+    if name is None:
+        name = f"{klass}{len(graph.nodes) + 1}"
+
+    node = NkNode(
+        name=name,
+        klass=klass,
+        x=xpos if xpos is not None else 0.0,
+        y=ypos if ypos is not None else 0.0,
+        inputs_spec=inputs_spec,
+        label=label,
+        knobs=knobs,
+        knob_offsets=offsets,
+        source=source if offsets else None,
+    )
+
+    # Build edges based on stack and inputs
+    mandatory, mask = _parse_inputs_spec(inputs_spec, klass)
+    total_inputs = mandatory + mask
+    inputs: List[Optional[str]] = []
+    for _ in range(total_inputs):
+        inputs.append(stack.pop() if stack else None)
+    inputs.reverse()
+
+    for idx, src in enumerate(inputs):
+        if src is None:
             continue
+        kind, align = _classify_input(klass, idx, mandatory, mask)
+        graph.edges.append(NkEdge(src=src, dst=node.name, input_index=idx, kind=kind, align=align))
+
+    stack.append(node.name)
+    graph.nodes.append(node)
+    return node.name
+
+
+def parse_nk(path: str, knobs: Optional[Iterable[str]] = DAG_KNOBS, lazy_knobs: bool = True) -> NkGraph:
+    """
+    Single pass over the file: stack ops are evaluated as they stream by and node bodies are
+    brace-counted without being kept. Group/Gizmo bodies go to nested NkGraphs (graph.groups),
+    each with its own stack and `set` variables, as Nuke evaluates them.
+    knobs: whitelist of knob values to decode (None keeps every knob).
+    lazy_knobs: record byte spans for the other knobs so NkNode.knob() can read them later.
+    """
+    wanted = None if knobs is None else _PARSE_KNOBS.union(knobs)
+    root = NkGraph()
+    graph = root
+    stack: List[Optional[str]] = []
+    variables: Dict[str, Optional[str]] = {}
+    # Enclosing scopes while inside Group bodies.
+    scopes: List[Tuple[NkGraph, List[Optional[str]], Dict[str, Optional[str]]]] = []
+
+    klass: Optional[str] = None
+    node_knobs: Dict[str, str] = {}
+    offsets: Dict[str, Tuple[int, int]] = {}
+    depth = 0
+    # Knob whose value spans several lines: name, value start offset, lines if materialised.
+    open_key: Optional[str] = None
+    open_start = 0
+    open_chunks: Optional[List[bytes]] = None
+
+    pos = 0
+    with open(path, "rb") as fh:
+        for raw in fh:
+            line_pos = pos
+            pos += len(raw)
+            if depth:
+                # Knob lines sit at depth 1; deeper lines are knob bodies (curves, Tcl) and
+                # only feed the brace count.
+                delta = raw.count(b"{") - raw.count(b"}")
+                if depth == 1:
+                    m = _KNOB_RE.match(raw)
+                    if m:
+                        key = m.group(1).decode("ascii")
+                        keep = wanted is None or key in wanted
+                        if delta > 0:
+                            open_key = key
+                            open_start = line_pos + m.start(2)
+                            open_chunks = [raw[m.start(2):]] if keep else None
+                        elif keep:
+                            node_knobs[key] = _knob_text(m.group(2))
+                        elif lazy_knobs:
+                            offsets[key] = (line_pos + m.start(2), line_pos + m.end(2))
+                elif open_chunks is not None:
+                    open_chunks.append(raw)
+                depth += delta
+                if open_key is not None and depth <= 1:
+                    if open_chunks is not None:
+                        node_knobs[open_key] = _knob_text(b"".join(open_chunks))
+                    elif lazy_knobs:
+                        offsets[open_key] = (open_start, line_pos + len(raw.rstrip()))
+                    open_key = None
+                    open_chunks = None
+                if depth <= 0:
+                    depth = 0
+                    name = _close_node(graph, stack, klass, node_knobs, offsets, path)
+                    if klass in GROUP_CLASSES and name is not None:
+                        scopes.append((graph, stack, variables))
+                        child = NkGraph(owner=name)
+                        graph.groups.append(child)
+                        graph, stack, variables = child, [], {}
+                    klass = None
+                    node_knobs = {}
+                    offsets = {}
+                continue
 
-        m_node = _NODE_START_RE.match(stripped)
-        if not m_node:
-            i += 1
-            continue
+            stripped = raw.strip()
+            if not stripped:
+                continue
 
-        klass = m_node.group(1)
-        block_lines = []
-        depth = 0
-        while i < len(lines):
-            l = lines[i]
-            block_lines.append(l)
-            depth += l.count("{") - l.count("}")
-            if depth == 0:
-                break
-            i += 1
-
-        # Parse knobs
-        name = None
-        xpos = None
-        ypos = None
-        inputs_spec = None
-        label = ""
-        knobs: Dict[str, str] = {}
-        for raw in block_lines[1:]:
-            s = raw.strip()
-            if not s or s.startswith("#"):
+            m_set = _SET_STACK_RE.match(stripped)
+            if m_set:
+                variables[m_set.group(1).decode("ascii")] = stack[-1] if stack else None
+                graph.has_stack = True
+                graph.explicit_stack_ops = True
                 continue
-            m = re.match(r"^([A-Za-z0-9_]+)\s+(.*)$", s)
-            if not m:
+
+            m_push = _PUSH_RE.match(stripped)
+            if m_push:
+                token = _knob_text(m_push.group(1))
+                if token.startswith("$"):
+                    val = variables.get(token[1:], None)
+                elif token == "0":
+                    val = None
+                else:
+                    val = token
+                stack.append(val)
+                graph.has_stack = True
+                graph.explicit_stack_ops = True
                 continue
-            key, val = m.group(1), m.group(2).strip()
-            knobs[key] = val
-            if key == "name":
-                name = val
-            elif key == "xpos":
-                try:
-                    xpos = float(val)
-                except ValueError:
-                    pass
-            elif key == "ypos":
-                try:
-                    ypos = float(val)
-                except ValueError:
-                    pass
-            elif key == "inputs":
-                inputs_spec = val
-            elif key == "label":
-                if val.startswith('"') and val.endswith('"'):
-                    val = val[1:-1]
-                label = val
 
-        if klass == "Root":
-            if name:
-                graph.root_name = name
-            i += 1
-            continue
+            if stripped == b"end_group":
+                # The Group node is already on the parent stack (pushed when its block closed).
+                if scopes:
+                    graph, stack, variables = scopes.pop()
+                continue
 
-        if name is None:
-            name = f"{klass}{len(graph.nodes) + 1}"
-        if xpos is None:
-            xpos = 0.0
-        if ypos is None:
-            ypos = 0.0
-
-        node = NkNode(
-            name=name,
-            klass=klass,
-            x=xpos,
-            y=ypos,
-            inputs_spec=inputs_spec,
-            label=label,
-            knobs=knobs,
-        )
-
-        # Build edges based on stack and inputs
-        mandatory, mask = _parse_inputs_spec(inputs_spec, klass)
-        total_inputs = mandatory + mask
-        inputs: List[Optional[str]] = []
-        for _ in range(total_inputs):
-            inputs.append(stack.pop() if stack else None)
-        inputs.reverse()
-
-        for idx, src in enumerate(inputs):
-            if src is None:
+            if stripped == b"pop":
+                if stack:
+                    stack.pop()
+                graph.has_stack = True
+                graph.explicit_stack_ops = True
                 continue
-            kind, align = _classify_input(klass, idx, mandatory, mask)
-            graph.edges.append(NkEdge(src=src, dst=node.name, input_index=idx, kind=kind, align=align))
 
-        stack.append(node.name)
-        explicit_push = False
-        graph.nodes.append(node)
-        i += 1
+            m_node = _NODE_START_RE.match(stripped)
+            if m_node:
+                klass = m_node.group(1).decode("ascii")
+                depth = raw.count(b"{") - raw.count(b"}")
+
+    # Unterminated last block: keep what was read, as a truncated file would still show it.
+    if klass is not None:
+        _close_node(graph, stack, klass, node_knobs, offsets, path)
 
-    return graph
+    return root
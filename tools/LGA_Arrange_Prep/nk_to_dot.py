@@ -3,27 +3,26 @@ Convert .nk directly to Graphviz DOT (via internal graph conversion).
 """
 
 from pathlib import Path
+import argparse
 import sys
 
 sys.path.append(str(Path(__file__).resolve().parent))
 
-from nk_to_graph import nk_to_graph
-from graphviz_export import to_dot
+from LGA_nk_to_json import nk_to_graph
+from graphviz_export import add_dot_arguments, dot_options, save_dot
 
 
 def main() -> None:
-    if len(sys.argv) < 3:
-        print("Usage: python nk_to_dot.py <input.nk> <output.dot> [scale] [tolerance_x]")
-        raise SystemExit(1)
-
-    nk_path = sys.argv[1]
-    out_path = sys.argv[2]
-    scale = float(sys.argv[3]) if len(sys.argv) > 3 else 0.05
-    tolerance_x = float(sys.argv[4]) if len(sys.argv) > 4 else 2.5
-
-    graph = nk_to_graph(nk_path, scale=scale, tolerance_x=tolerance_x)
-    dot = to_dot(graph, title=Path(nk_path).stem)
-    Path(out_path).write_text(dot, encoding="utf-8")
+    ap = argparse.ArgumentParser(description=".nk -> Graphviz DOT.")
+    ap.add_argument("input", help="Input .nk")
+    ap.add_argument("output", help="Output .dot")
+    ap.add_argument("scale", nargs="?", type=float, default=0.05)
+    ap.add_argument("tolerance_x", nargs="?", type=float, default=2.5)
+    add_dot_arguments(ap)
+    args = ap.parse_args()
+
+    graph = nk_to_graph(args.input, scale=args.scale, tolerance_x=args.tolerance_x)
+    save_dot(graph, args.output, title=Path(args.input).stem, **dot_options(args))
 
 
 if __name__ == "__main__":
@@ -1,30 +1,27 @@
 """
 Prep pipeline: .nk -> graph.json -> graph.dot, plus direct .nk -> dot.
+Batch mode: a directory of comps -> graph.json -> layout -> checks, one JSON line per file.
 """
 
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
+from typing import Any, Dict, List, Optional
+import argparse
+import json
+import os
 import sys
+import time
 
 sys.path.append(str(Path(__file__).resolve().parent))
 
-from nk_to_graph import nk_to_graph
-from graph_io import save_graph_json
-from graphviz_export import to_dot
+from LGA_nk_to_json import nk_to_graph
+from graph_io import graph_to_dict, save_graph_json
+from graphviz_export import save_dot
+from layout_core import layout
+from LGA_check_JSON_arrange import check_alignment, check_overlaps
 
 
-def write_text(path: Path, text: str) -> None:
-    path.write_text(text, encoding="utf-8")
-
-
-def main() -> None:
-    if len(sys.argv) < 2:
-        print("Usage: python prep_cli.py <input.nk> [out_dir]")
-        raise SystemExit(1)
-
-    nk_path = Path(sys.argv[1]).resolve()
-    out_dir = Path(sys.argv[2]).resolve() if len(sys.argv) > 2 else Path(__file__).resolve().parent / "out"
-    out_dir.mkdir(parents=True, exist_ok=True)
-
+def run_single(nk_path: Path, out_dir: Path) -> None:
     base = nk_path.stem
     graph_json = out_dir / f"{base}.graph.json"
     dot_from_nk = out_dir / f"{base}.from_nk.dot"
@@ -34,21 +31,118 @@ def main() -> None:
     save_graph_json(graph, str(graph_json), meta=meta)
 
     # Direct .nk -> dot
-    dot_direct = to_dot(graph, title=base)
-    write_text(dot_from_nk, dot_direct)
+    save_dot(graph, str(dot_from_nk), title=base)
 
     # Graph JSON -> dot
     # Re-load to validate roundtrip
     from graph_io import load_graph_json
 
     graph2 = load_graph_json(str(graph_json))
-    dot_round = to_dot(graph2, title=base)
-    write_text(dot_from_graph, dot_round)
+    save_dot(graph2, str(dot_from_graph), title=base)
 
     print(f"Wrote: {graph_json}")
     print(f"Wrote: {dot_from_nk}")
     print(f"Wrote: {dot_from_graph}")
 
 
+def process_nk(nk_path: str, out_dir: str, min_gap: float) -> Dict[str, Any]:
+    """One batch job: .nk -> graph.json -> layout -> arranged json + checks. Never raises."""
+    result: Dict[str, Any] = {"file": nk_path}
+    phases: Dict[str, float] = {}
+    try:
+        base = Path(out_dir) / Path(nk_path).stem
+
+        t0 = time.perf_counter()
+        graph, meta = nk_to_graph(nk_path, return_meta=True)
+        save_graph_json(graph, f"{base}.graph.json", meta=meta)
+        phases["parse"] = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        layout(graph, min_gap=min_gap)
+        phases["layout"] = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        data = graph_to_dict(graph, meta=meta)
+        nodes = {n["name"]: n for n in data["nodes"]}
+        result["align_errors"] = len(check_alignment(nodes, data["edges"], tol=1e-3))
+        result["overlap_errors"] = len(check_overlaps(nodes, tol=1e-6))
+        save_graph_json(graph, f"{base}.graph.arranged.json", meta=meta)
+        phases["check"] = time.perf_counter() - t0
+
+        result.update(nodes=len(graph.nodes), edges=len(graph.edges), iterations=graph.iterations_used)
+    except Exception as exc:
+        result["error"] = f"{type(exc).__name__}: {exc}"
+    result["phases"] = {k: round(v, 6) for k, v in phases.items()}
+    return result
+
+
+def run_batch(root: Path, out_dir: Path, min_gap: float, workers: Optional[int], jsonl: Optional[Path]) -> int:
+    """Fan every .nk under root out to a process pool; returns the number of failed files."""
+    nk_files = sorted(p for p in root.rglob("*.nk") if p.is_file())
+    if not nk_files:
+        print(f"No .nk files under {root}", file=sys.stderr)
+        return 0
+
+    # Mirror the input tree so comps with the same name in different shots don't collide.
+    jobs: List[Any] = []
+    for nk in nk_files:
+        job_dir = out_dir / nk.parent.relative_to(root)
+        job_dir.mkdir(parents=True, exist_ok=True)
+        jobs.append((str(nk), str(job_dir)))
+
+    sink = jsonl.open("w", encoding="utf-8") if jsonl else sys.stdout
+    total_nodes = 0
+    failed = 0
+    t0 = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(process_nk, nk, job_dir, min_gap) for nk, job_dir in jobs]
+            # Results stream out as files finish, not in submission order.
+            for fut in as_completed(futures):
+                res = fut.result()
+                if "error" in res:
+                    failed += 1
+                else:
+                    total_nodes += res["nodes"]
+                sink.write(json.dumps(res) + "\n")
+                sink.flush()
+    finally:
+        if sink is not sys.stdout:
+            sink.close()
+    wall = time.perf_counter() - t0
+
+    files = len(jobs)
+    print(
+        f"Batch: {files} files ({failed} failed), {total_nodes} nodes in {wall:.2f}s | "
+        f"{files / wall:.2f} files/s, {total_nodes / wall:.0f} nodes/s",
+        file=sys.stderr,
+    )
+    return failed
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Prep pipeline for a .nk file, or batch over a directory of comps.")
+    ap.add_argument("input", help=".nk file, or a directory searched recursively for .nk files")
+    ap.add_argument("out_dir", nargs="?", default=str(Path(__file__).resolve().parent / "out"))
+    ap.add_argument("--min-gap", type=float, default=0.2, help="Batch: layout min gap")
+    ap.add_argument("--workers", type=int, default=None, help="Batch: processes (default: CPU count)")
+    ap.add_argument("--jsonl", default=None, help="Batch: write per-file JSON lines here instead of stdout")
+    ap.add_argument("--fail-on-error", action="store_true", help="Batch: exit 1 if any file failed")
+    args = ap.parse_args()
+
+    in_path = Path(args.input).resolve()
+    out_dir = Path(args.out_dir).resolve()
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    if not in_path.is_dir():
+        run_single(in_path, out_dir)
+        return
+
+    workers = args.workers or os.cpu_count() or 1
+    failed = run_batch(in_path, out_dir, args.min_gap, workers, Path(args.jsonl) if args.jsonl else None)
+    if failed and args.fail_on_error:
+        raise SystemExit(1)
+
+
 if __name__ == "__main__":
     main()
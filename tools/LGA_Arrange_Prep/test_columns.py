@@ -0,0 +1,139 @@
+"""
+Property check: the sort-and-sweep column clustering (sweep_clusters, used by
+_group_columns and the engine's _auto_columns) against the previous first-fit loop.
+Run: python -m unittest test_columns   (from LGA_Arrange_Prep)
+"""
+
+from pathlib import Path
+from typing import Dict, List, Tuple
+import random
+import sys
+import unittest
+
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from LGA_nk_to_json import _group_columns
+from layout_core import Graph, Node, sweep_clusters
+from LGA_arrange_engine.layout import _auto_columns  # noqa: E402  (layout_core puts py/ on sys.path)
+
+SEEDS = range(300)
+TOLERANCES = [0.0, 0.5, 2.5, 7.0]
+
+
+def first_fit_clusters(xs: List[float], tolerance: float) -> List[Tuple[float, List[float]]]:
+    """Reference: the loop sweep_clusters replaced (first fit against every open cluster)."""
+    groups: List[List[float]] = []
+    centers: List[float] = []
+    for x in sorted(xs):
+        placed = False
+        for i, cx in enumerate(centers):
+            if abs(x - cx) <= tolerance:
+                groups[i].append(x)
+                centers[i] = sum(groups[i]) / len(groups[i])
+                placed = True
+                break
+        if not placed:
+            groups.append([x])
+            centers.append(x)
+    return sorted(zip(centers, groups), key=lambda t: t[0])
+
+
+def random_xs(rng: random.Random) -> List[float]:
+    """Node centers of a random comp: columns of random width separated by random gaps."""
+    xs: List[float] = []
+    left = rng.uniform(-50.0, 50.0)
+    for _col in range(rng.randint(1, 12)):
+        width = rng.choice([0.0, 0.5, 2.0, rng.uniform(0.0, 10.0)])
+        for _node in range(rng.randint(1, 15)):
+            x = left + rng.uniform(0.0, width)
+            # Integer px positions (scale 0.05) are common in real comps and produce exact ties.
+            xs.append(round(x * 20) / 20 if rng.random() < 0.5 else x)
+        left += width + rng.choice([0.0, 0.3, 2.5, rng.uniform(0.0, 12.0)])
+    rng.shuffle(xs)
+    return xs
+
+
+def expand(clusters: List[Tuple[float, int]], xs: List[float]) -> List[Tuple[float, List[float]]]:
+    """Sweep output as (mean, members), sorted by mean like the callers do."""
+    ordered = sorted(xs)
+    out: List[Tuple[float, List[float]]] = []
+    start = 0
+    for mean, size in clusters:
+        out.append((mean, ordered[start:start + size]))
+        start += size
+    return sorted(out, key=lambda t: t[0])
+
+
+class SweepClustersTest(unittest.TestCase):
+    def test_matches_first_fit(self) -> None:
+        for seed in SEEDS:
+            rng = random.Random(seed)
+            xs = random_xs(rng)
+            for tol in TOLERANCES:
+                with self.subTest(seed=seed, tolerance=tol):
+                    got = expand(sweep_clusters(sorted(xs), tol), xs)
+                    # Means must be bit-identical, not just close: columns are keyed on them.
+                    self.assertEqual(got, first_fit_clusters(xs, tol))
+
+    def test_empty(self) -> None:
+        self.assertEqual(sweep_clusters([], 2.5), [])
+
+
+def _nodes(xs: List[float], rng: random.Random) -> List[Node]:
+    return [
+        Node(name=f"N{i}", klass="Grade", column="C0", order=0, x=x, y=rng.uniform(-100.0, 100.0), height=1.0)
+        for i, x in enumerate(xs)
+    ]
+
+
+def _reference_columns(nodes: List[Node], tolerance: float) -> Tuple[Dict[str, float], Dict[str, str]]:
+    """The previous first-fit loop on nodes: column centers and the column of each node."""
+    groups: List[List[Node]] = []
+    centers: List[float] = []
+    for node in sorted(nodes, key=lambda n: n.x):
+        placed = False
+        for i, cx in enumerate(centers):
+            if abs(node.x - cx) <= tolerance:
+                groups[i].append(node)
+                centers[i] = sum(n.x for n in groups[i]) / len(groups[i])
+                placed = True
+                break
+        if not placed:
+            groups.append([node])
+            centers.append(node.x)
+    ordered = sorted(zip(centers, groups), key=lambda t: t[0])
+    columns = {n.name: f"C{idx}" for idx, (_cx, grp) in enumerate(ordered) for n in grp}
+    return {f"C{idx}": cx for idx, (cx, _grp) in enumerate(ordered)}, columns
+
+
+class ColumnAssignmentTest(unittest.TestCase):
+    def test_group_columns(self) -> None:
+        for seed in SEEDS:
+            xs = random_xs(random.Random(seed))
+            for tol in TOLERANCES:
+                rng = random.Random(seed)
+                nodes = _nodes(xs, rng)
+                with self.subTest(seed=seed, tolerance=tol):
+                    centers, columns = _reference_columns(nodes, tol)
+                    self.assertEqual(_group_columns(nodes, tolerance_x=tol), centers)
+                    self.assertEqual({n.name: n.column for n in nodes}, columns)
+
+    def test_engine_auto_columns(self) -> None:
+        for seed in SEEDS:
+            xs = random_xs(random.Random(seed))
+            for tol in TOLERANCES:
+                rng = random.Random(seed)
+                nodes = _nodes(xs, rng)
+                with self.subTest(seed=seed, tolerance=tol):
+                    centers, columns = _reference_columns(nodes, tol)
+                    graph = Graph(auto_columns=True, tolerance_x=tol)
+                    for n in nodes:
+                        graph.add_node(n)
+                    # The engine clusters on original_x; without it, it falls back to x.
+                    _auto_columns(graph)
+                    self.assertEqual(dict(graph.column_positions), centers)
+                    self.assertEqual({n.name: n.column for n in nodes}, columns)
+
+
+if __name__ == "__main__":
+    unittest.main()